@@ -222,6 +222,8 @@ def time2str(d_time: datetime.time) -> str:
 )
 def algo_power_btn_callback(on):
     DBApi.update_algo_power_status(db, on)
+    # Drop the strategy-side cache so the toggle is visible immediately
+    redis_backend.delete("algo:power")
     run_config = DBApi.get_run_config(db)
     if on:
         output = [[config.run, time2str(config.time), False] for config in run_config]
@@ -265,6 +267,8 @@ def save_run_config_callback(n_clicks, *args):
             "time": d_time
         }
     DBApi.update_run_config(db, data)
+    # Drop the strategy-side per-day caches so the new config is visible immediately
+    redis_backend.delete(*[f"algo:run_config:{day}" for day in data])
     return ["Config saved successfully"]
 
 
@@ -293,6 +297,8 @@ def manual_exit_callback(n_clicks):
     if not n_clicks:
         return [""]
     redis_backend.set("MANUAL_EXIT", "True")
+    # Wake the strategy control loop immediately instead of waiting out its poll timeout
+    redis_backend.publish("strategy1:events", "MANUAL_EXIT")
     return [""]
 
 
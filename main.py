@@ -3,21 +3,28 @@ File:           main.py
 Author:         Dibyaranjan Sathua
 Created on:     29/08/22, 1:31 am
 """
-from typing import Optional
-import argparse
+from typing import Optional, List
+from types import SimpleNamespace
+import sys
+import threading
 import traceback
 
+from dotenv import load_dotenv
+
 from src import BASE_DIR
-from src.market_feeds.market_feeds import MarketFeeds
-from src.strategies.strategy1 import Strategy1
-from src.price_monitor.price_monitor import PriceMonitor
-from src.brokerapi.angelbroking import AngelBrokingSymbolParser
 from src.utils.redis_backend import RedisBackend
 from src.utils.config_reader import ConfigReader
 from src.utils.logger import LogFacade
-from src.telegram.bot import Bot
+
+# MarketFeeds, Strategy1, PriceMonitor etc are imported lazily inside the run_*
+# functions. Their transitive imports (broker SDK, sqlalchemy, websockets) cost
+# hundreds of ms, and a process started with only one mode shouldn't pay for both
 
 
+# Load env vars once at process start. Individual modules shouldn't re-read the
+# dotenv file on every setup call
+load_dotenv(dotenv_path=BASE_DIR / 'env' / '.env')
+
 config_path = BASE_DIR / 'data' / 'config.json'
 config = ConfigReader(config_file_path=config_path)
 
@@ -32,6 +39,9 @@ def clean_up():
 
 def run_market_feed(market_feed_logger: LogFacade, option_type: Optional[str] = None):
     """ Run market feed """
+    from src.market_feeds.market_feeds import MarketFeeds
+    from src.brokerapi.angelbroking import AngelBrokingSymbolParser
+
     market_feeds_accounts = config["market_feeds"]
     symbol_parser = AngelBrokingSymbolParser.instance()
     if option_type is None:
@@ -63,6 +73,10 @@ def run_market_feed(market_feed_logger: LogFacade, option_type: Optional[str] =
 
 def run_strategy1(logger: LogFacade, dry_run: bool):
     """ Run strategy1 """
+    from src.strategies.strategy1 import Strategy1
+    from src.price_monitor.price_monitor import PriceMonitor
+    from src.telegram.bot import Bot
+
     strategy_config = config["strategies"][Strategy1.STRATEGY_CODE]
     trading_accounts = config["trading_accounts"]
     telegram_config = config["telegram"]
@@ -106,15 +120,49 @@ def run_strategy1(logger: LogFacade, dry_run: bool):
     price_monitor.stop_monitor = True
 
 
+def run_both(trading_logger: LogFacade, market_feed_logger: LogFacade, dry_run: bool):
+    """ Run market feeds and trading in one process. The two subsystems use separate
+    broker accounts (websocket connection limits), so logins stay independent, but one
+    process shares a single symbol master download via the AngelBrokingSymbolParser
+    singleton and avoids a second interpreter start """
+    feed_thread = threading.Thread(
+        target=run_market_feed, args=(market_feed_logger,), daemon=True
+    )
+    feed_thread.start()
+    run_strategy1(logger=trading_logger, dry_run=dry_run)
+
+
+def parse_args(argv: List[str]) -> SimpleNamespace:
+    """ Parse the handful of command line flags with a plain argv scan. argparse and its
+    transitive imports are noticeable on cold start, which matters for intraday restarts """
+    option_type: Optional[str] = None
+    if "--option-type" in argv:
+        index = argv.index("--option-type")
+        if index + 1 < len(argv):
+            # Use for market feeds to get strike data
+            option_type = argv[index + 1]
+    flags = set(argv)
+    return SimpleNamespace(
+        market_feeds="--market-feeds" in flags,
+        trading="--trading" in flags,
+        both="--both" in flags,
+        dry_run="--dry-run" in flags,
+        clean_up="--clean-up" in flags,
+        option_type=option_type,
+    )
+
+
 def main():
     """ Main function """
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--market-feeds", action="store_true")
-    parser.add_argument("--trading", action="store_true")
-    parser.add_argument("--dry-run", action="store_true")
-    parser.add_argument("--clean-up", action="store_true")
-    parser.add_argument("--option-type", type=str, help="Use for market feeds to get strike data")
-    args = parser.parse_args()
+    args = parse_args(sys.argv[1:])
+    if args.both:
+        trading_logger: LogFacade = LogFacade.get_logger("trading_main")
+        market_feed_logger: LogFacade = LogFacade.get_logger("market_feed_main")
+        try:
+            run_both(trading_logger, market_feed_logger, dry_run=args.dry_run)
+        except Exception as err:
+            trading_logger.error(err)
+            trading_logger.exception(traceback.print_exc())
     if args.trading:
         trading_logger: LogFacade = LogFacade.get_logger("trading_main")
         try:
@@ -4,16 +4,20 @@ Author:         Dibyaranjan Sathua
 Created on:     05/08/22, 9:52 pm
 """
 from typing import Optional, List, Dict
+from collections import deque
 import datetime
 import time
 import enum
+import threading
 import traceback
 
 import requests
 import pyotp
 from smartapi import SmartConnect, SmartWebSocket as SmartWebSocket_
 
-from src.brokerapi.base_api import BaseApi, BrokerApiError, BrokerOrderApiError
+from src.brokerapi.base_api import (
+    BaseApi, BrokerApiError, BrokerOrderApiError, make_pooled_session, shared_session
+)
 from src.brokerapi.angelbroking.websocketv2 import SmartWebSocketV2
 from src.strategies.instrument import Instrument, Action
 from src.utils.redis_backend import RedisBackend
@@ -77,6 +81,10 @@ class AngelBrokingApi(BaseApi):
         self._password = password
         self._totp_key = totp_key
         self._smart_connect = SmartConnect(api_key=self._api_key)
+        # Use a pooled keep-alive session for all broker HTTP calls so each order/funds
+        # call reuses a warm TLS connection instead of paying a fresh TCP+TLS handshake
+        self._session = make_pooled_session()
+        self._smart_connect.reqsession = self._session
         self._refresh_token: Optional[str] = None
         self._access_token: Optional[str] = None
         self._feed_token: Optional[str] = None
@@ -116,6 +124,10 @@ class AngelBrokingApi(BaseApi):
         self._symbol_parser = AngelBrokingSymbolParser.instance()
         logger.info(f"Login successful")
 
+    def close(self):
+        """ Close the pooled HTTP session """
+        self._session.close()
+
     def get_user_profile(self):
         """ Return user profile """
         response = self._smart_connect.getProfile(self._refresh_token)
@@ -161,6 +173,8 @@ class AngelBrokingApi(BaseApi):
 
     def place_intraday_options_order(self, instrument: Instrument):
         """ Place intraday options order, Return True if order placed successfully else False """
+        # Angel SmartAPI websockets are market-data only. Order entry has to go over
+        # REST, so the best we can do latency wise is the pooled keep-alive session.
         # Get the symbol details such as trading symbol and symbol token
         symbol_data = self.get_symbol_data(instrument)
         action = OrderConstants.TransactionType.BUY.value if instrument.action == Action.BUY \
@@ -262,6 +276,12 @@ class AngelBrokingMarketFeed:
         self._token_subscribed = []
         self._token_symbol_mapper = TokenSymbolMapper()
         self._redis_backend = RedisBackend()
+        # Bounded ring buffer between the websocket thread and the redis writer. The
+        # socket callback only appends (O(1)) and the oldest tick is dropped when the
+        # consumer lags, which is fine as we only care about the latest price
+        self._tick_ring: deque = deque(maxlen=512)
+        self._tick_event: threading.Event = threading.Event()
+        self._drain_thread: Optional[threading.Thread] = None
 
     def setup(self):
         """ Setup websocket """
@@ -278,6 +298,8 @@ class AngelBrokingMarketFeed:
         """ Connect to websocket """
         # Connect to redis backend
         self._redis_backend.connect()
+        self._drain_thread = threading.Thread(target=self.drain_ticks, daemon=True)
+        self._drain_thread.start()
         self._web_socket.connect()
 
     def subscribe(self):
@@ -303,8 +325,24 @@ class AngelBrokingMarketFeed:
             self._web_socket.subscribe(correlation_id, mode, script)
 
     def on_data(self, ws, message):
-        print(f"Ticks: {message}")
-        self.parse_save(message)
+        self._tick_ring.append(message)
+        self._tick_event.set()
+
+    def drain_ticks(self):
+        """ Consume ticks from the ring buffer and save them to redis. Runs on its own
+        thread so a slow redis write never back-pressures the websocket thread """
+        while True:
+            self._tick_event.wait()
+            self._tick_event.clear()
+            batch = []
+            while True:
+                try:
+                    batch.append(self._tick_ring.popleft())
+                except IndexError:
+                    break
+            if batch:
+                print(f"Ticks: {batch}")
+                self.parse_save_batch(batch)
 
     def on_open(self, ws):
         print("On Open")
@@ -317,6 +355,11 @@ class AngelBrokingMarketFeed:
     def on_close(self, ws):
         print("On Close")
 
+    def parse_save_batch(self, messages: List) -> None:
+        """ Parse and save a batch of drained websocket messages """
+        for message in messages:
+            self.parse_save(message)
+
     def parse_save(self, message) -> None:
         """ Parse the market websocket message and save it to redis backend """
         if type(message) == dict:
@@ -412,7 +455,7 @@ class AngelBrokingSymbolParser:
 
     def _parse(self):
         """ Parse JSON data """
-        response = requests.get(self.symbol_master_file)
+        response = shared_session.get(self.symbol_master_file)
         if response.ok:
             data = response.json()
             self._nifty_instruments = [x for x in data if x["name"] == "NIFTY"]
@@ -3,6 +3,33 @@ File:           base_api.py
 Author:         Dibyaranjan Sathua
 Created on:     07/08/22, 3:06 pm
 """
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def make_pooled_session(
+        pool_connections: int = 4, pool_maxsize: int = 16, retries: int = 2
+) -> requests.Session:
+    """ Build a keep-alive session with a connection pool so repeated HTTPS calls
+    reuse warm TLS connections instead of paying a fresh handshake each time """
+    session = requests.Session()
+    session.headers["Connection"] = "keep-alive"
+    session.mount(
+        "https://",
+        HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=Retry(total=retries, backoff_factor=0.05)
+        )
+    )
+    return session
+
+
+# Session shared by one-off module level requests (symbol master download etc).
+# Broker clients build their own via make_pooled_session so per-account auth state
+# never leaks across sessions
+shared_session = make_pooled_session()
 
 
 class BrokerApiError(Exception):
@@ -15,4 +42,9 @@ class BrokerOrderApiError(Exception):
 
 class BaseApi:
     """ Base API class used as interface to other broker API """
-    pass
+
+    def place_basket_order(self, instruments: list) -> None:
+        """ Place all the instruments orders in a single broker call. Brokers without a
+        basket endpoint should leave this unimplemented and callers fall back to placing
+        the orders individually """
+        raise NotImplementedError
@@ -3,7 +3,7 @@ File:           price_monitor.py
 Author:         Dibyaranjan Sathua
 Created on:     18/08/22, 5:58 pm
 """
-from typing import Optional, Callable, List
+from typing import Optional, Callable, Dict, List
 from dataclasses import dataclass
 import datetime
 import time
@@ -42,13 +42,24 @@ class PriceRegister:
 class PriceMonitor:
     """ Price monitor class """
     REGISTER: List[PriceRegister] = []
+    # Ticks land in redis roughly once a second, so lookups of the same symbol within
+    # this window would just re-read the same tick
+    PRICE_MEMO_TTL: float = 0.5
 
     def __init__(self):
         self._redis_backend = RedisBackend()
+        # symbol -> (monotonic timestamp, ltp). See _get_ltp
+        self._price_memo: dict = {}
         self._symbol_parser: Optional[AngelBrokingSymbolParser] = None
         self._expiry: Optional[datetime.date] = None
         self._expiry_str = ""
-        self.stop_monitor = False
+        # (strike, option_type) -> symbol string. The strike space is tiny, so the
+        # formatted strings are built once and reused. See get_symbol
+        self._symbol_cache: Dict[tuple, str] = {}
+        self._monitor_thread: Optional[threading.Thread] = None
+        # Event instead of a plain bool so the monitor wakes up immediately on stop
+        # instead of finishing its 2 sec sleep
+        self._stop_event: threading.Event = threading.Event()
 
     def setup(self):
         """ Setup required class for price monitor """
@@ -56,6 +67,7 @@ class PriceMonitor:
         self._symbol_parser = AngelBrokingSymbolParser.instance()
         self._expiry = self._symbol_parser.current_week_expiry
         self._expiry_str = self._expiry.strftime("%d%b%y").upper()
+        self._symbol_cache.clear()      # symbols embed the expiry
 
     def get_atm_strike(self):
         """ Return ATM strike """
@@ -63,14 +75,27 @@ class PriceMonitor:
 
     def get_nifty_value(self) -> float:
         """ Return nifty value """
-        symbol_data = self._redis_backend.get("NIFTY")
-        if symbol_data is None:
-            raise PriceMonitorError(f"NIFTY data is missing in redis")
+        return self._get_ltp("NIFTY")
+
+    def _get_ltp(self, symbol: str) -> float:
+        """ Return the last traded price of a symbol with a short-lived memo. PnL,
+        shifting and registration checks in the same loop iteration ask for the same
+        symbols, so calls within PRICE_MEMO_TTL share a single redis round trip """
+        memo = self._price_memo.get(symbol)
+        if memo is not None and time.monotonic() - memo[0] < self.PRICE_MEMO_TTL:
+            return memo[1]
+        symbol_data = self._redis_backend.get(symbol)
+        if symbol_data is None or "ltp" not in symbol_data:
+            raise PriceMonitorError(f"{symbol} data is missing in redis")
         now = int(datetime.datetime.now().timestamp())
         price_last_updated = now - symbol_data["timestamp"]
         if price_last_updated > 1800:       # 60 * 30 sec = 30 min
-            raise PriceNotUpdatedError("NIFTY price has not been updated in last 30 minutes")
-        return symbol_data["ltp"]
+            raise PriceNotUpdatedError(
+                f"{symbol} price has not been updated in last 30 minutes"
+            )
+        ltp = symbol_data["ltp"]
+        self._price_memo[symbol] = (time.monotonic(), ltp)
+        return ltp
 
     def get_strike_by_price(self, price: float, option_type: str) -> int:
         """ Return the strike nearest to the price argument """
@@ -160,24 +185,38 @@ class PriceMonitor:
 
     def get_price_by_symbol(self, symbol: str):
         """ Return the price of a symbol """
-        symbol_data = self._redis_backend.get(symbol)
-        if symbol_data is None or "ltp" not in symbol_data:
-            raise PriceMonitorError(f"{symbol} data is missing in redis")
-        now = int(datetime.datetime.now().timestamp())
-        price_last_updated = now - symbol_data["timestamp"]
-        if price_last_updated > 1800:  # 60 * 30 sec = 30 min
-            raise PriceNotUpdatedError(
-                f"Strike {symbol} price has not been updated in last 30 minutes"
-            )
-        return symbol_data["ltp"]
+        return self._get_ltp(symbol)
+
+    def get_prices_by_symbols(self, symbols: List[str]) -> List[float]:
+        """ Return the prices of several symbols with a single redis MGET. Symbols
+        still fresh in the memo skip the round trip entirely """
+        prices = {}
+        missing = []
+        for symbol in symbols:
+            memo = self._price_memo.get(symbol)
+            if memo is not None and time.monotonic() - memo[0] < self.PRICE_MEMO_TTL:
+                prices[symbol] = memo[1]
+            else:
+                missing.append(symbol)
+        if missing:
+            now = int(datetime.datetime.now().timestamp())
+            for symbol, symbol_data in zip(missing, self._redis_backend.mget(missing)):
+                if symbol_data is None or "ltp" not in symbol_data:
+                    raise PriceMonitorError(f"{symbol} data is missing in redis")
+                price_last_updated = now - symbol_data["timestamp"]
+                if price_last_updated > 1800:       # 60 * 30 sec = 30 min
+                    raise PriceNotUpdatedError(
+                        f"{symbol} price has not been updated in last 30 minutes"
+                    )
+                ltp = symbol_data["ltp"]
+                self._price_memo[symbol] = (time.monotonic(), ltp)
+                prices[symbol] = ltp
+        return [prices[symbol] for symbol in symbols]
 
     def monitor(self):
         """ Monitor price of a symbol and call appropriate function """
         # Remove the PriceRegister obj when a function is called
-        while True:
-            if self.stop_monitor:
-                logger.info(f"Stopping price monitoring")
-                break
+        while not self._stop_event.is_set():
             # Remove the PriceRegister object that is triggered
             triggered_signals: List[PriceRegister] = []
             for reg in self.REGISTER:
@@ -210,11 +249,24 @@ class PriceMonitor:
             for reg in triggered_signals:
                 logger.info(f"Removing reg with id {id(reg)}")
                 self.REGISTER.remove(reg)
-            time.sleep(2)
+            self._stop_event.wait(2)
+        logger.info(f"Stopping price monitoring")
 
     def run_in_background(self):
         """ Run the monitor in background """
-        threading.Thread(target=self.monitor).start()
+        self._monitor_thread = threading.Thread(target=self.monitor, daemon=True)
+        self._monitor_thread.start()
+
+    @property
+    def stop_monitor(self) -> bool:
+        return self._stop_event.is_set()
+
+    @stop_monitor.setter
+    def stop_monitor(self, value: bool) -> None:
+        if value:
+            self._stop_event.set()
+        else:
+            self._stop_event.clear()
 
     @classmethod
     def register(
@@ -239,12 +291,44 @@ class PriceMonitor:
         cls.REGISTER.append(register)
         return register
 
+    @classmethod
+    def register_bulk(cls, registrations: List[Dict]) -> List[PriceRegister]:
+        """ Register several price triggers in one go. Each entry is the keyword dict
+        register() takes. Prices are read from redis, so there is no per-symbol
+        subscribe round trip to pay -- the point of the bulk form is that all the
+        PriceRegister objects are built first and land in REGISTER with one extend,
+        so the monitor thread never scans a partially registered set """
+        registers = [
+            PriceRegister(
+                symbol=reg["symbol"],
+                reference_price=reg["reference_price"],
+                up_point=reg["up_point"],
+                up_func=reg["up_func"],
+                down_point=reg["down_point"] * -1,
+                down_func=reg["down_func"]
+            )
+            for reg in registrations
+        ]
+        cls.REGISTER.extend(registers)
+        return registers
+
     @classmethod
     def deregister(cls, price_register: PriceRegister) -> None:
         cls.REGISTER.remove(price_register)
 
+    @classmethod
+    def deregister_bulk(cls, price_registers: List[PriceRegister]) -> None:
+        """ Remove several price triggers in one go """
+        for price_register in price_registers:
+            cls.REGISTER.remove(price_register)
+
     def get_symbol(self, strike: int, option_type: str) -> str:
-        return f"NIFTY{self._expiry_str}{strike}{option_type}"
+        key = (strike, option_type)
+        symbol = self._symbol_cache.get(key)
+        if symbol is None:
+            symbol = f"NIFTY{self._expiry_str}{strike}{option_type}"
+            self._symbol_cache[key] = symbol
+        return symbol
 
     @staticmethod
     def get_nearest_50_strike(index: float) -> int:
@@ -3,14 +3,12 @@ File:           base_strategy.py
 Author:         Dibyaranjan Sathua
 Created on:     22/08/22, 9:29 pm
 """
-from typing import Optional
-from abc import ABC, abstractmethod
+from typing import Optional, Sequence
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
 import datetime
-import os
+import time
 
-from dotenv import load_dotenv
-
-from src import BASE_DIR
 from src.brokerapi.angelbroking import AngelBrokingApi
 from src.strategies.instrument import Instrument, PairInstrument, Action
 from src.utils.logger import LogFacade
@@ -18,11 +16,26 @@ from src.utils.logger import LogFacade
 
 logger: LogFacade = LogFacade.get_logger("base_strategy")
 
+# Session boundaries as seconds of day, precomputed once so the market hour checks that
+# run for every tick compare plain ints instead of allocating datetime.time objects
+_MARKET_OPEN_SEC: int = 9 * 3600 + 15 * 60          # 9:15 AM
+_MARKET_CLOSE_SEC: int = 15 * 3600 + 30 * 60        # 3:30 PM
+_SESSION_END_SEC: int = 15 * 3600 + 35 * 60         # 3:35 PM
+
 
-class BaseStrategy(ABC):
-    """ Abstract class contains common functions that needs to be implemented in the child class """
+class BaseStrategy:
+    """ Base class contains common functions that needs to be implemented in the child class.
+    Required overrides are validated at class-definition time via __init_subclass__ instead
+    of ABCMeta, which keeps instantiation and isinstance checks on the plain-class fast path.
+    """
     STRATEGY_CODE: str = ""
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for method in ("entry", "exit", "execute"):
+            if getattr(cls, method) is getattr(BaseStrategy, method):
+                raise TypeError(f"{cls.__name__} must implement {method}()")
+
     def __init__(
             self,
             api_key: str,
@@ -39,20 +52,35 @@ class BaseStrategy(ABC):
         self.dry_run: bool = dry_run
         self.clean_up_flag: bool = clean_up
         self._broker_api: Optional[AngelBrokingApi] = None
+        # Executor used to place CE and PE legs in parallel. Broker API is blocking REST,
+        # so placing the legs on separate threads overlaps the two HTTP round trips.
+        self._order_executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="order"
+        )
+        # Short lived cache of the funds and margin response. get_initial_capital and
+        # get_used_margin are usually queried back to back and return the same dict
+        self._funds_cache: Optional[tuple] = None       # (monotonic timestamp, funds dict)
+        # Bound broker methods, assigned in setup_broking_api so the hot order/poll
+        # paths skip the attribute dispatch through self._broker_api
+        self._place_order = None
+        self._fetch_funds = None
+        self._fetch_orderbook = None
+        # Orders skipped because of dry-run mode. Summarized periodically instead of
+        # logging every skip, which dominates CPU in tick-replay backtests
+        self._dryrun_skips: int = 0
 
-    @abstractmethod
     def entry(self) -> None:
         pass
 
-    @abstractmethod
     def exit(self) -> None:
         pass
 
-    @abstractmethod
     def execute(self) -> None:
         self.setup_broking_api()
 
-    def process_live_tick(self) -> None:
+    def process_live_ticks(self, ticks: Sequence) -> None:
+        """ Hook invoked with a batch of live ticks. Feeds drain their buffers every few
+        ms, so strategies pay Python call overhead once per batch instead of per tick """
         pass
 
     def setup_broking_api(self):
@@ -64,49 +92,132 @@ class BaseStrategy(ABC):
             totp_key=self._totp_key
         )
         self._broker_api.login()
+        self._place_order = self._broker_api.place_intraday_options_order
+        self._fetch_funds = self._broker_api.get_funds_and_margin
+        self._fetch_orderbook = self._broker_api.get_order_book
+
+    def teardown_broking_api(self):
+        """ Close the broker API HTTP session once the strategy is done """
+        if self._broker_api is not None:
+            self._broker_api.close()
+
+    def _get_funds(self, ttl: float = 0.5) -> dict:
+        """ Get funds and margin from broker API. Successive calls within ttl share one
+        HTTP round trip """
+        if self._funds_cache is not None:
+            timestamp, funds = self._funds_cache
+            if time.monotonic() - timestamp < ttl:
+                return funds
+        funds = self._fetch_funds()
+        self._funds_cache = (time.monotonic(), funds)
+        return funds
 
     def get_initial_capital(self) -> float:
         """ Get the available capital from broker API """
-        funds = self._broker_api.get_funds_and_margin()
+        funds = self._get_funds()
         return float(funds["availablecash"])
 
     def get_used_margin(self) -> float:
         """ Get used margin from broker API """
-        funds = self._broker_api.get_funds_and_margin()
+        funds = self._get_funds()
         return float(funds["utiliseddebits"])
 
     def get_orderbook(self) -> list:
         """ Get list of orders placed in the day """
-        return self._broker_api.get_order_book()
+        return self._fetch_orderbook()
 
     def place_pair_instrument_order(self, pair_instrument: PairInstrument):
         """ Place the order using broker API """
         if self.dry_run:
-            logger.info(
-                f"Skipping placing order for pair instrument {pair_instrument} as running in "
-                f"dry-run mode"
+            self._record_dryrun_skip(pair_instrument)
+            return None
+        try:
+            # Single broker call when the broker supports a basket endpoint
+            self._broker_api.place_basket_order(
+                [pair_instrument.ce_instrument, pair_instrument.pe_instrument]
             )
+            self._funds_cache = None
             return None
-        self._broker_api.place_intraday_options_order(pair_instrument.ce_instrument)
-        self._broker_api.place_intraday_options_order(pair_instrument.pe_instrument)
+        except NotImplementedError:
+            pass
+        # Fire both legs concurrently so pair entry pays only one broker round trip
+        futures = [
+            self._order_executor.submit(self._place_order, pair_instrument.ce_instrument),
+            self._order_executor.submit(self._place_order, pair_instrument.pe_instrument),
+        ]
+        wait(futures)
+        # Margin changes once orders are placed
+        self._funds_cache = None
+        for future in futures:
+            # Re-raise any order placement error in the caller thread
+            future.result()
+
+    def place_basket_instrument_order(self, instruments: Sequence[Instrument]) -> bool:
+        """ Try to place all the instruments in one basket call. Return True when the
+        orders went out (or dry-run), False when the broker has no basket endpoint and
+        the caller should fall back to pair placement """
+        if self.dry_run:
+            for instrument in instruments:
+                self._record_dryrun_skip(instrument)
+            return True
+        try:
+            self._broker_api.place_basket_order(list(instruments))
+        except NotImplementedError:
+            return False
+        self._funds_cache = None
+        return True
+
+    def _record_dryrun_skip(self, instrument) -> None:
+        """ Count a skipped dry-run order. The instrument is only formatted at DEBUG and
+        an INFO summary goes out every 100 skips """
+        self._dryrun_skips += 1
+        logger.debug("Dry-run skip #%d for %s", self._dryrun_skips, instrument)
+        if self._dryrun_skips % 100 == 0:
+            logger.info("Dry-run skipped %d orders so far", self._dryrun_skips)
+
+    @contextmanager
+    def buffered_orders(self):
+        """ Accumulate instruments inside the with-block and flush them in one basket call
+        (or concurrently when the broker has no basket endpoint) at block exit. Use this
+        when a single decision emits more than one pair so the legs don't serialize """
+        buffer = []
+        yield buffer
+        if not buffer:
+            return
+        if self.dry_run:
+            logger.info(
+                "Skipping placing %d buffered orders as running in dry-run mode", len(buffer)
+            )
+            return
+        try:
+            self._broker_api.place_basket_order(buffer)
+        except NotImplementedError:
+            futures = [
+                self._order_executor.submit(self._place_order, instrument)
+                for instrument in buffer
+            ]
+            wait(futures)
+            for future in futures:
+                future.result()
+        finally:
+            self._funds_cache = None
 
     def place_instrument_order(self, instrument: Instrument):
         """ Place the order using broker API """
         if self.dry_run:
-            logger.info(
-                f"Skipping placing order for instrument {instrument} as running in dry-run mode"
-            )
+            self._record_dryrun_skip(instrument)
             return None
-        self._broker_api.place_intraday_options_order(instrument)
+        self._place_order(instrument)
+        # Margin changes once the order is placed
+        self._funds_cache = None
 
     @staticmethod
     def is_market_hour(dt: datetime.datetime) -> bool:
         """ Return True if dt is in market hour 9:15:01 to 3:29:59. dt is IST timezone """
-        start_time = datetime.time(hour=9, minute=15)
-        end_time = datetime.time(hour=15, minute=30)
-        return start_time < dt.time() < end_time
+        seconds_of_day = dt.hour * 3600 + dt.minute * 60 + dt.second
+        return _MARKET_OPEN_SEC < seconds_of_day < _MARKET_CLOSE_SEC
 
     @staticmethod
     def trading_session_ends(now: datetime.datetime):
-        """ Return true if the time is greater than 3:36 PM else false """
-        return now.time().hour == 15 and now.time().minute > 35
+        """ Return true if the time is greater than 3:35 PM else false """
+        return now.hour * 3600 + now.minute * 60 > _SESSION_END_SEC
@@ -16,6 +16,12 @@ class Action(IntEnum):
 
 @dataclass()
 class Instrument:
+    # Thousands of instruments get created over a trading day (option chain scans,
+    # shifting); slots keep them small and make attribute access a fixed offset load
+    __slots__ = (
+        "action", "lot_size", "expiry", "option_type", "strike", "index", "entry", "price",
+        "order_id", "_symbol"
+    )
     action: Action                 # BUY or SELL
     lot_size: Optional[int]
     expiry: Optional[datetime.date]
@@ -26,21 +32,33 @@ class Instrument:
     price: Optional[float]
     order_id: Optional[str]
 
+    def __post_init__(self):
+        self._symbol = None
+
     def __str__(self):
         return self.symbol
 
     @property
     def symbol(self):
-        date_str = self.expiry.strftime("%d%b%y").upper()
-        return f"{self.index}{date_str}{self.strike}{self.option_type}"
+        # Built once and cached. symbol is read on every price lookup, and none of
+        # the fields it derives from change after construction
+        if self._symbol is None:
+            date_str = self.expiry.strftime("%d%b%y").upper()
+            self._symbol = f"{self.index}{date_str}{self.strike}{self.option_type}"
+        return self._symbol
 
 
 class PairInstrument:
     """ Pair CE and PE instrument """
+    __slots__ = ("ce_instrument", "pe_instrument")
 
-    def __init__(self):
-        self.ce_instrument: Optional[Instrument] = None
-        self.pe_instrument: Optional[Instrument] = None
+    def __init__(
+            self,
+            ce_instrument: Optional[Instrument] = None,
+            pe_instrument: Optional[Instrument] = None
+    ):
+        self.ce_instrument: Optional[Instrument] = ce_instrument
+        self.pe_instrument: Optional[Instrument] = pe_instrument
 
     def __str__(self):
         return f"{self.ce_instrument} & {self.pe_instrument} with {self.ce_instrument.lot_size} qty"
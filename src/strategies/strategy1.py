@@ -3,10 +3,13 @@ File:           strategy1.py
 Author:         Dibyaranjan Sathua
 Created on:     22/08/22, 9:30 pm
 """
-import time
-from typing import Optional, Tuple
+from typing import Optional
+from collections import defaultdict, deque
+from concurrent.futures import wait
+from functools import cached_property, lru_cache
 import datetime
 import math
+import time
 import traceback
 import threading
 
@@ -28,11 +31,51 @@ from dashboard.db.models import AlgoRunConfig
 logger: LogFacade = LogFacade.get_logger("strategy1")
 db = SessionLocal()
 
+# Thursday second-shifting cutoff (1:30 PM) as seconds of day
+_SECOND_SHIFT_CUTOFF_SEC: int = 13 * 3600 + 30 * 60
+
+
+@lru_cache(maxsize=128)
+def _expiry_symbol_fragment(expirydate: str) -> str:
+    """ Map an orderbook expirydate (%d%b%Y) to the %d%b%y fragment used in trading
+    symbols. strptime is slow and every leg of a day's orderbook repeats the same
+    one or two expiry strings, so the parse is memoized """
+    expiry = datetime.datetime.strptime(expirydate, "%d%b%Y").date()
+    return expiry.strftime("%d%b%y").upper()
+
+
+def _to_sod(t) -> int:
+    """ Convert a time or datetime to integer seconds of day. The per-tick time
+    checks compare these ints instead of allocating datetime.time objects """
+    return t.hour * 3600 + t.minute * 60 + t.second
+
 
 class Strategy1(BaseStrategy):
     """ Expiry day strategy for shorting straddle """
     STRATEGY_CODE: str = "strategy1"
     QUANTITY: int = 50
+    # Pub/sub channel used to wake the control loop as soon as an event (manual exit)
+    # is published instead of waiting out the poll interval
+    EVENTS_CHANNEL: str = "strategy1:events"
+    # Channel carrying PnL updates. Only published when the value actually moves
+    PNL_CHANNEL: str = "strategy1:pnl"
+    # Redis hash mirroring the live straddle (strike, leg symbols, shift sequence)
+    STRADDLE_STATE_KEY: str = "strategy1:straddle"
+    # Full trade state blob for crash recovery
+    STATE_KEY: str = "strategy1:state"
+    # Short-TTL redis cache keys for the dashboard database reads. The dashboard
+    # drops them whenever it mutates the underlying rows
+    POWER_CACHE_KEY: str = "algo:power"
+    RUN_CONFIG_CACHE_KEY: str = "algo:run_config:{day}"
+    DB_CACHE_TTL: int = 5
+    # How often the control loop must run its periodic checks once a trade is live
+    POLL_INTERVAL: int = 2
+    # Longest the loop blocks before entry. Keeps day-config/time changes noticed
+    # within a minute while cutting idle wakeups from 30/min to 1/min
+    MAX_IDLE_WAIT: int = 60
+    # Ticks land about once a second, so pnl computed within this window would come
+    # out the same. Matches PriceMonitor.PRICE_MEMO_TTL
+    PNL_MEMO_TTL: float = 0.5
 
     def __init__(
             self,
@@ -54,32 +97,57 @@ class Strategy1(BaseStrategy):
         self._price_monitor: PriceMonitor = price_monitor
         self._config: ConfigReader = config
         self._pnl: float = 0
+        # (monotonic timestamp, pnl). See get_strategy_pnl
+        self._pnl_memo: Optional[tuple] = None
         self._first_shifting: bool = False      # Indicate if first shifting is done
         self._straddle_strike: int = 0
         self._market_price: float = 0
         self._weekday: Optional[Weekdays] = None
+        # Hoisted once the weekday is known so the hot loop doesn't redo the
+        # .name.lower() and nested config lookups every tick
+        self._weekday_name: str = ""
+        self._shift_hedges_enabled: bool = False
+        # Per-day config values bound by _bind_day_config once the weekday is known
+        self._sl_cfg: Optional[float] = None
+        self._target_cfg: Optional[float] = None
+        self._ce_buy_cfg: Optional[float] = None
+        self._pe_buy_cfg: Optional[float] = None
+        self._entry_time_cfg: Optional[datetime.time] = None
+        self._exit_time_cfg: Optional[datetime.time] = None
+        self._capital_percent_cfg = None
+        self._margin_cfg = None
         # At any point we should register once
         self._price_monitor_register: bool = False
         self._entry_taken: bool = False
         self._entry_time: Optional[datetime.datetime] = None
         self._changed_entry_time: Optional[datetime.time] = None
+        # Entry/exit deadlines as seconds of day, lazily cached for the per-tick
+        # checks. _entry_sod is reset whenever the entry time changes
+        self._entry_sod: Optional[int] = None
+        self._exit_sod: Optional[int] = None
+        # Remaining-lot deadline (entry + 25 mins), cached once entry time is known
+        self._remaining_lot_sod: Optional[int] = None
         self._sl: Optional[float] = None
         self._target: Optional[float] = None
-        self._initial_capital: Optional[float] = None
         self._lot_size: int = 0
         self._remaining_lot_traded: bool = False    # Indicate if remaining lot traded or not
-        self._remaining_lot_size: Optional[int] = None
-        self._actual_margin_per_lot: Optional[float] = None
         self._day_config: Optional[AlgoRunConfig] = None        # Database model to save run time
         self._redis_backend = RedisBackend()
+        # Lua script registered in execute() once redis is connected
+        self._shift_straddle_script = None
         self._bot: Bot = bot                        # Telegram bot for sending notification
-        self._lock: threading.Lock = threading.Lock()
+        # Reentrant so helpers can take it for their own short mutations even when the
+        # caller already holds it
+        self._lock: threading.RLock = threading.RLock()
         # Set this to True when straddle reach one of the hedge
         self._stop_shifting_hedges: bool = False
+        # Last PnL pushed to redis, used to skip writes when nothing moved
+        self._last_published_pnl: Optional[float] = None
 
     def entry(self) -> None:
         """ Entry logic """
         self._entry_time = istnow()
+        self._remaining_lot_sod = None
         logger.info(f"Entry taken at {self._entry_time}")
         self._market_price = self._price_monitor.get_nifty_value()
         self._straddle_strike = self._price_monitor.get_atm_strike()
@@ -110,10 +178,7 @@ class Strategy1(BaseStrategy):
         )
         logger.info(f"Hedging {self._hedging}")
         hedging_price = self.get_pair_instrument_entry_price(self._hedging)
-        logger.info(f"Hedging price: {hedging_price}")
-        self.place_pair_instrument_order(self._hedging)
-        # Partial entry taken. Need to exit if there is any issue place other orders.
-        self._entry_taken = True
+        logger.info(f"Hedging price: {hedging_price:.2f}")
         # Sell Straddle
         self._straddle.ce_instrument = self.get_instrument(
             strike=self._straddle_strike,
@@ -131,10 +196,22 @@ class Strategy1(BaseStrategy):
         )
         logger.info(f"Shorting straddle {self._straddle}")
         straddle_price = self.get_pair_instrument_entry_price(self._straddle)
-        logger.info(f"Straddle price: {straddle_price}")
-        self.place_pair_instrument_order(self._straddle)
+        logger.info(f"Straddle price: {straddle_price:.2f}")
+        # Entry considered taken before any order goes out so a partial fill gets
+        # squared off by exit_during_exception
         self._entry_taken = True
+        # All 4 legs in one broker call when a basket endpoint exists
+        basket = [
+            self._hedging.ce_instrument, self._hedging.pe_instrument,
+            self._straddle.ce_instrument, self._straddle.pe_instrument
+        ]
+        if not self.place_basket_instrument_order(basket):
+            # Pair-wise fallback keeps the hedges-first ordering for margin benefit
+            self.place_pair_instrument_order(self._hedging)
+            self.place_pair_instrument_order(self._straddle)
         self._bot.send_notification(f"Entry taken at {self._entry_time}")
+        self._record_straddle_state()
+        self._save_state()
         logger.info(f"Remaining lot to trade: {self.remaining_lot_size}")
 
     def exit_during_exception(self) -> None:
@@ -144,13 +221,15 @@ class Strategy1(BaseStrategy):
             logger.error(err)
             self._bot.send_notification(f"NOT ABLE TO SQUARE OFF ORDER. ORDER PUNCHING ISSUE.")
             self._bot.send_notification(str(err))
-            self._bot.send_notification(f"MANUAL EXIT")
+            # Must reach telegram even if the process dies right after
+            self._bot.send_notification_sync(f"MANUAL EXIT")
         except Exception as err:
             logger.error(err)
             logger.exception(traceback.print_exc())
             self._bot.send_notification(f"NOT ABLE TO SQUARE OFF ORDER. UNKNOWN EXCEPTION.")
             self._bot.send_notification(str(err))
-            self._bot.send_notification(f"MANUAL EXIT")
+            # Must reach telegram even if the process dies right after
+            self._bot.send_notification_sync(f"MANUAL EXIT")
 
     def exit(self) -> None:
         """ Exit logic """
@@ -170,11 +249,15 @@ class Strategy1(BaseStrategy):
             self._hedging.ce_instrument.action = Action.SELL
             self._hedging.pe_instrument.action = Action.SELL
             self.place_pair_instrument_order(self._hedging)
+        # The square-off orders just changed the position; don't serve a memoized pnl
+        self._pnl_memo = None
         pnl = self.get_strategy_pnl()
         logger.info(f"Final PnL: {pnl}")
         self._redis_backend.set("LIVE_PNL", str(pnl))
         self._bot.send_notification(f"PnL: {pnl}")
         self._entry_taken = False
+        # Nothing left to recover once the positions are squared off
+        self._redis_backend.delete(self.STATE_KEY)
 
     def monitor_pnl(self, pnl: float) -> bool:
         """
@@ -198,54 +281,65 @@ class Strategy1(BaseStrategy):
             self._execute()
         except PriceMonitorError as err:
             logger.error(err)
-            self._bot.send_notification(f"ALGO NOT WORKING. MARKET DATA FETCHING ISSUE.")
-            self._bot.send_notification(str(err))
+            # Square off open positions first; the notifications go out from the bot
+            # thread while the legs are already being closed
             if self._entry_taken:
                 self.exit_during_exception()
+            self._bot.send_notification(f"ALGO NOT WORKING. MARKET DATA FETCHING ISSUE.")
+            self._bot.send_notification(str(err))
         except PriceNotUpdatedError as err:
             logger.error(err)
-            self._bot.send_notification(f"ALGO NOT WORKING. MARKET DATA NOT UPDATED.")
-            self._bot.send_notification(str(err))
             if self._entry_taken:
                 self.exit_during_exception()
+            self._bot.send_notification(f"ALGO NOT WORKING. MARKET DATA NOT UPDATED.")
+            self._bot.send_notification(str(err))
         except BrokerOrderApiError as err:
             logger.error(err)
-            self._bot.send_notification(f"ALGO NOT WORKING. ORDER PUNCHING ISSUE.")
-            self._bot.send_notification(str(err))
             if self._entry_taken:
                 self.exit_during_exception()
+            self._bot.send_notification(f"ALGO NOT WORKING. ORDER PUNCHING ISSUE.")
+            self._bot.send_notification(str(err))
         except BrokerApiError as err:
             logger.error(err)
-            self._bot.send_notification(f"ALGO NOT WORKING. BROKER API ISSUE.")
-            self._bot.send_notification(str(err))
             if self._entry_taken:
                 self.exit_during_exception()
+            self._bot.send_notification(f"ALGO NOT WORKING. BROKER API ISSUE.")
+            self._bot.send_notification(str(err))
         except Exception as err:
             logger.error(err)
             logger.exception(traceback.print_exc())
-            self._bot.send_notification(f"ALGO NOT WORKING. UNKNOWN EXCEPTION.")
-            self._bot.send_notification(str(err))
             if self._entry_taken:
                 self.exit_during_exception()
+            self._bot.send_notification(f"ALGO NOT WORKING. UNKNOWN EXCEPTION.")
+            self._bot.send_notification(str(err))
         logger.info(f"Stopping price monitoring")
         self._price_monitor.stop_monitor = True
+        self.teardown_broking_api()
+        # Let queued notifications drain before the process (and the daemon bot
+        # thread) goes away
+        self._bot.flush()
         logger.info(f"Execution completed")
 
     def _execute(self) -> None:
         """ Execute the strategy """
-        power = DBApi.get_algo_power(db)
-        if not power.on:
+        self._redis_backend.connect()
+        self._shift_straddle_script = self._redis_backend.register_script("shift_straddle.lua")
+        if not self._get_algo_power():
             logger.info(f"Algo System is OFF")
             return None
-        self._redis_backend.connect()
         logger.info(f"Starting execution of strategy {Strategy1.STRATEGY_CODE}")
         self._bot.send_notification(f"Starting execution of strategy {Strategy1.STRATEGY_CODE}")
         super(Strategy1, self).execute()
         now = istnow()
         self._weekday = Weekdays(now.weekday())
+        self._weekday_name = self._weekday.name.lower()
+        self._shift_hedges_enabled = bool(
+            self._config["option_buying_shifting"][self._weekday_name]
+        )
+        self._bind_day_config()
         logger.info(f"Trading day: {self._weekday.name}")
         # Check if Algo is ON for this day
-        self._day_config = DBApi.get_run_config_by_day(db, day=self._weekday.name.lower())
+        self._day_config = self._get_day_config(self._weekday_name)
         if not self._day_config.run:
             logger.info(f"Algo System is OFF for {self._weekday.name}")
             self._bot.send_notification(f"Algo System is OFF for {self._weekday.name}")
@@ -256,7 +350,14 @@ class Strategy1(BaseStrategy):
         logger.info(f"Target percent: {self.target_percent}")
         logger.info(f"Expected margin per lot: {self.expected_margin_per_lot}")
         logger.info(f"Entry time: {self.entry_time}")
+        # A crash after entry leaves open positions the new process knows nothing
+        # about. Rehydrate them so monitoring/exit picks up where the old run died
+        if self._restore_state():
+            self._bot.send_notification(
+                f"Resuming live trade restored from an earlier run of the day"
+            )
         self._redis_backend.set("MANUAL_EXIT", "False")
+        events = self._redis_backend.pubsub(self.EVENTS_CHANNEL)
         while True:
             now = istnow()
             if self.check_entry_time(now) and not self._entry_taken:
@@ -266,8 +367,11 @@ class Strategy1(BaseStrategy):
                     if 60 <= straddle_price <= 110:
                         self.entry()
                     else:
-                        logger.info(f"Straddle price {straddle_price} is outside range 60 - 110.")
+                        logger.info(
+                            f"Straddle price {straddle_price:.2f} is outside range 60 - 110."
+                        )
                         self._changed_entry_time = datetime.time(hour=10, minute=20)
+                        self._entry_sod = None      # entry time changed
                         logger.info(f"Changing the entry time to {self._changed_entry_time}")
                 else:
                     self.entry()
@@ -275,129 +379,156 @@ class Strategy1(BaseStrategy):
                 self.exit()
                 break
             if self._entry_taken:
-                with self._lock:
-                    if self.time_to_trade_remaining_lot(now) and not self._remaining_lot_traded \
-                            and self.remaining_lot_size > 0:
-                        self.trade_remaining_lot()
+                # Cheap check first so the loop doesn't block on the lock (a straddle
+                # shift holds it across broker calls) when there is nothing to trade
+                if self.time_to_trade_remaining_lot(now) and not self._remaining_lot_traded \
+                        and self.remaining_lot_size > 0:
+                    with self._lock:
+                        # Re-check under the lock: a concurrent shift may have traded
+                        # the remaining lot while we waited
+                        if not self._remaining_lot_traded and self.remaining_lot_size > 0:
+                            self.trade_remaining_lot(now)
                 if not self._first_shifting:
                     # Logic for first shifting
                     self.first_shifting_registration()
                 else:
                     # Second shifting onwards
-                    self.second_shifting_registration()
-                if self._config["option_buying_shifting"][self._weekday.name.lower()] and \
-                        not self._stop_shifting_hedges:
-                    self.shift_hedging()
+                    self.second_shifting_registration(now)
+                if self._shift_hedges_enabled and not self._stop_shifting_hedges:
+                    self.shift_hedging(now)
                 pnl = self.get_strategy_pnl()       # Fetching it every 2 secs
                 logger.info(f"Lot traded: {self._lot_size}")
                 logger.info(f"Strategy PnL: {pnl}")
-                self._redis_backend.set("LIVE_PNL", str(pnl))
+                # Publish the PnL (only when it moved) and read the manual exit flag
+                # in one round trip. LIVE_PNL stays for pollers; subscribers get the
+                # push on the pnl channel
+                pnl_changed = (
+                    self._last_published_pnl is None
+                    or abs(pnl - self._last_published_pnl) > 0.01
+                )
+                with self._redis_backend.pipeline() as pipe:
+                    if pnl_changed:
+                        pipe.set("LIVE_PNL", str(pnl))
+                        pipe.publish(self.PNL_CHANNEL, str(pnl))
+                    pipe.get("MANUAL_EXIT")
+                    manual_exit = pipe.execute()[-1]
+                if pnl_changed:
+                    self._last_published_pnl = pnl
+                manual_exit = self._redis_backend.decode(manual_exit) if manual_exit else None
                 target_sl_hit = self.monitor_pnl(pnl)
                 if target_sl_hit:
                     break
+            else:
+                manual_exit = self._redis_backend.get("MANUAL_EXIT")
             # Check if manual exit is True
-            if self._redis_backend.get("MANUAL_EXIT") == "True":
+            if manual_exit == "True":
                 logger.info(f"Manual exit triggered")
                 self._bot.send_notification(f"Manual exit triggered")
                 self.exit()
                 break
-            time.sleep(2)
+            # Block on the event channel instead of sleeping blind. A published event
+            # (e.g. manual exit from the dashboard) wakes the loop immediately while the
+            # timeout keeps the periodic PnL/shifting checks running
+            events.get_message(timeout=self._next_wakeup_timeout(now))
         logger.info(f"Stopping price monitoring")
         self._price_monitor.stop_monitor = True
         logger.info(f"Execution completed")
 
+    def _get_algo_power(self) -> bool:
+        """ Algo power flag through a short-TTL redis cache. A redis GET (~1ms) replaces
+        the DB query on warm restarts; the dashboard deletes the key on toggle so a
+        stale value never outlives a click """
+        cached = self._redis_backend.get(self.POWER_CACHE_KEY)
+        if cached is not None:
+            return cached == "True"
+        power = DBApi.get_algo_power(db)
+        self._redis_backend.set(self.POWER_CACHE_KEY, str(power.on), ex=self.DB_CACHE_TTL)
+        return power.on
+
+    def _get_day_config(self, day: str) -> AlgoRunConfig:
+        """ Per-day run config through the same short-TTL redis cache as the power flag """
+        key = self.RUN_CONFIG_CACHE_KEY.format(day=day)
+        cached = self._redis_backend.get(key)
+        if cached is not None:
+            run_time = datetime.time.fromisoformat(cached["time"]) if cached["time"] else None
+            return AlgoRunConfig(day=day, run=cached["run"], time=run_time)
+        day_config = DBApi.get_run_config_by_day(db, day=day)
+        self._redis_backend.set(
+            key,
+            {
+                "run": day_config.run,
+                "time": day_config.time.isoformat() if day_config.time else ""
+            },
+            ex=self.DB_CACHE_TTL
+        )
+        return day_config
+
     def first_shifting_registration(self):
         """ Straddle first shifting """
-        if self._market_price > self._straddle_strike:
-            # This part of the code is running inside an infinite loop. So we need a
-            # safety guard for not registering for price monitor more than once
-            if not self._price_monitor_register:
-                up_point = int(abs(self._market_price - self._straddle_strike - 50))        # 50
-                down_point = int(abs(self._market_price - self._straddle_strike + 40))      # 40
-                logger.info(
-                    f"First shifting will be done when market moves above "
-                    f"{self._market_price + up_point} or below {self._market_price - down_point}"
-                )
-                PriceMonitor.register(
-                    symbol="NIFTY",
-                    reference_price=self._market_price,
-                    up_point=up_point,
-                    up_func=self.thread_safe_shift_straddle,
-                    down_point=down_point,
-                    down_func=self.thread_safe_shift_straddle
-                )
-                self._price_monitor_register = True
-        else:
-            if not self._price_monitor_register:
-                up_point = int(abs(self._market_price - self._straddle_strike - 40))        # 40
-                down_point = int(abs(self._market_price - self._straddle_strike + 50))      # 50
-                logger.info(
-                    f"First shifting will be done when market moves above "
-                    f"{self._market_price + up_point} or below {self._market_price - down_point}"
-                )
-                PriceMonitor.register(
-                    symbol="NIFTY",
-                    reference_price=self._market_price,
-                    up_point=up_point,
-                    up_func=self.thread_safe_shift_straddle,
-                    down_point=down_point,
-                    down_func=self.thread_safe_shift_straddle
-                )
-                self._price_monitor_register = True
+        # This part of the code is running inside an infinite loop. So we need a
+        # safety guard for not registering for price monitor more than once
+        if self._price_monitor_register:
+            return None
+        # The wider offset goes on the side the market already moved towards. delta is
+        # bounded by the ATM rounding (< 25 points for 50 step strikes)
+        delta = self._market_price - self._straddle_strike
+        up_offset, down_offset = (50, 40) if delta > 0 else (40, 50)
+        up_point = int(abs(delta - up_offset))
+        down_point = int(abs(delta + down_offset))
+        logger.info(
+            f"First shifting will be done when market moves above "
+            f"{self._market_price + up_point} or below {self._market_price - down_point}"
+        )
+        PriceMonitor.register(
+            symbol="NIFTY",
+            reference_price=self._market_price,
+            up_point=up_point,
+            up_func=self.thread_safe_shift_straddle,
+            down_point=down_point,
+            down_func=self.thread_safe_shift_straddle
+        )
+        self._price_monitor_register = True
 
-    def second_shifting_registration(self):
+    def second_shifting_registration(self, now: Optional[datetime.datetime] = None):
         """ Straddle second shifting onwards """
-        now = istnow()
-        if now.time() > datetime.time(hour=13, minute=30) and self._weekday == Weekdays.THURSDAY:
-            # This is only applicable for Thursday
-            # Shifting after 1:30 PM
-            # When time passes 1:30 PM, remove previous registers and register new shifting
-            # if second_shifting_register is not None:
-            #     PriceMonitor.deregister(second_shifting_register)
-            #     self._price_monitor_register = False
-            # Unless the previous register is triggered, don't register any new trigger
-            if not self._price_monitor_register:
-                logger.info(
-                    f"Next shifting will be done when market moves above "
-                    f"{self._market_price + 35} or below {self._market_price - 35}"
-                )
-                PriceMonitor.register(
-                    symbol="NIFTY",
-                    reference_price=self._market_price,
-                    up_point=35,
-                    up_func=self.thread_safe_shift_straddle,
-                    down_point=35,
-                    down_func=self.thread_safe_shift_straddle
-                )
-                self._price_monitor_register = True
+        now = now or istnow()
+        # Unless the previous register is triggered, don't register any new trigger
+        if self._price_monitor_register:
+            return None
+        # Tighter 35 point band only on Thursday after 1:30 PM, 45 points otherwise
+        if _to_sod(now) > _SECOND_SHIFT_CUTOFF_SEC and self._weekday == Weekdays.THURSDAY:
+            offset = 35
         else:
-            # Second shifting after the first shifting but before 1:30 PM
-            if not self._price_monitor_register:
-                logger.info(
-                    f"Next shifting will be done when market moves above "
-                    f"{self._market_price + 45} or below {self._market_price - 45}"
-                )
-                PriceMonitor.register(
-                    symbol="NIFTY",
-                    reference_price=self._market_price,
-                    up_point=45,
-                    up_func=self.thread_safe_shift_straddle,
-                    down_point=45,
-                    down_func=self.thread_safe_shift_straddle
-                )
-                self._price_monitor_register = True
+            offset = 45
+        logger.info(
+            f"Next shifting will be done when market moves above "
+            f"{self._market_price + offset} or below {self._market_price - offset}"
+        )
+        PriceMonitor.register(
+            symbol="NIFTY",
+            reference_price=self._market_price,
+            up_point=offset,
+            up_func=self.thread_safe_shift_straddle,
+            down_point=offset,
+            down_func=self.thread_safe_shift_straddle
+        )
+        self._price_monitor_register = True
 
     def thread_safe_shift_straddle(self):
         """ Thread safe """
         with self._lock:
             self.shift_straddle()
             
-    def shift_straddle(self):
+    def shift_straddle(self, now: Optional[datetime.datetime] = None):
         """ Shift straddle """
         if self._straddle is None:
             return None
+        # One timestamp per shift. Callers in the control loop pass their loop tick;
+        # the price monitor trigger path falls back to a fresh one
+        now = now or istnow()
         self._market_price = self._price_monitor.get_nifty_value()
-        current_straddle_strike = self._price_monitor.get_atm_strike()
+        # ATM strike derives from the nifty value we just fetched. Don't ask redis again
+        current_straddle_strike = self._price_monitor.get_nearest_50_strike(self._market_price)
         if current_straddle_strike == self._straddle_strike:
             logger.info(
                 f"Skipping straddle shift as previous straddle strike and current straddle "
@@ -429,17 +560,19 @@ class Strategy1(BaseStrategy):
             self._straddle = None
             self._straddle_strike = 0
             self._stop_shifting_hedges = True
+            self._record_straddle_state()
+            self._save_state()
             return None
 
         self._straddle_strike = current_straddle_strike
         logger.info(f"Shifting straddle")
         logger.info(
             f"Previous straddle {self._straddle} entry price: "
-            f"{self.get_pair_instrument_entry_price(self._straddle)}"
+            f"{self.get_pair_instrument_entry_price(self._straddle):.2f}"
         )
         logger.info(
             f"Previous straddle {self._straddle} exit price: "
-            f"{self.get_pair_instrument_current_price(self._straddle)}"
+            f"{self.get_pair_instrument_current_price(self._straddle):.2f}"
         )
         # Calculate the pnl of previous straddle
         straddle_pnl = self.get_pair_instrument_pnl(self._straddle)
@@ -453,13 +586,12 @@ class Strategy1(BaseStrategy):
 
         logger.info(f"Market price: {self._market_price}")
         logger.info(f"ATM strike: {self._straddle_strike}")
-        now = istnow()
         # If remaining lots are not traded, during shifting trade the remaining lot
         if self.time_to_trade_remaining_lot(now) and not self._remaining_lot_traded and \
                 self.remaining_lot_size > 0:
             logger.info(f"Trading remaining {self.remaining_lot_size} lot during shifting")
             self._lot_size += self.remaining_lot_size
-            self.buy_remaining_lot_hedging()
+            self.buy_remaining_lot_hedging(now)
             logger.info(f"Final lot size: {self._lot_size}")
             self._remaining_lot_traded = True
 
@@ -479,7 +611,7 @@ class Strategy1(BaseStrategy):
         )
         logger.info(f"Shifting straddle to {self._straddle}")
         straddle_price = self.get_pair_instrument_entry_price(self._straddle)
-        logger.info(f"Straddle price: {straddle_price}")
+        logger.info(f"Straddle price: {straddle_price:.2f}")
         # Placing actual order
         self.place_pair_instrument_order(self._straddle)
         if not self._first_shifting:
@@ -489,10 +621,125 @@ class Strategy1(BaseStrategy):
         # Once this function is triggered, we can reset self._price_monitor_register so that
         # we can register for new shifting
         self._price_monitor_register = False
+        self._record_straddle_state()
+        self._save_state()
+
+    def _record_straddle_state(self) -> None:
+        """ Mirror the live straddle into redis. The registered lua script updates the
+        strike, leg symbols and shift sequence in one EVALSHA instead of a GET/SET per
+        field, so observers always see a consistent snapshot """
+        if self._shift_straddle_script is None:
+            return None
+        if self._straddle is not None and self._straddle.ce_instrument is not None:
+            strike = self._straddle_strike
+            ce_symbol = self._straddle.ce_instrument.symbol
+            pe_symbol = self._straddle.pe_instrument.symbol
+        else:
+            strike, ce_symbol, pe_symbol = 0, "", ""
+        self._shift_straddle_script(
+            keys=[self.STRADDLE_STATE_KEY],
+            args=[strike, ce_symbol, pe_symbol, istnow().isoformat()]
+        )
 
-    def shift_hedging(self):
+    @staticmethod
+    def _instrument_to_dict(instrument: Optional[Instrument]) -> Optional[dict]:
+        if instrument is None:
+            return None
+        return {
+            "action": instrument.action.name,
+            "lot_size": instrument.lot_size,
+            "expiry": instrument.expiry.isoformat(),
+            "option_type": instrument.option_type,
+            "strike": instrument.strike,
+            "index": instrument.index,
+            "entry": instrument.entry.isoformat(),
+            "price": instrument.price,
+            "order_id": instrument.order_id
+        }
+
+    @staticmethod
+    def _instrument_from_dict(data: Optional[dict]) -> Optional[Instrument]:
+        if data is None:
+            return None
+        return Instrument(
+            action=Action[data["action"]],
+            lot_size=data["lot_size"],
+            expiry=datetime.date.fromisoformat(data["expiry"]),
+            option_type=data["option_type"],
+            strike=data["strike"],
+            index=data["index"],
+            entry=datetime.datetime.fromisoformat(data["entry"]),
+            price=data["price"],
+            order_id=data["order_id"]
+        )
+
+    @classmethod
+    def _pair_to_dict(cls, pair: Optional[PairInstrument]) -> Optional[dict]:
+        if pair is None:
+            return None
+        return {
+            "ce": cls._instrument_to_dict(pair.ce_instrument),
+            "pe": cls._instrument_to_dict(pair.pe_instrument)
+        }
+
+    @classmethod
+    def _pair_from_dict(cls, data: Optional[dict]) -> Optional[PairInstrument]:
+        if data is None:
+            return None
+        return PairInstrument(
+            ce_instrument=cls._instrument_from_dict(data["ce"]),
+            pe_instrument=cls._instrument_from_dict(data["pe"])
+        )
+
+    def _save_state(self) -> None:
+        """ Persist the in-memory trade state to redis as one JSON blob. A single SET
+        is already atomic and one round trip (no lua needed), so a crash loses at most
+        the mutations since the last save and a restarted process can square off what
+        the dead one left open """
+        state = {
+            "day": istnow().date().isoformat(),
+            "entry_taken": self._entry_taken,
+            "entry_time": self._entry_time.isoformat() if self._entry_time else None,
+            "pnl": self._pnl,
+            "first_shifting": self._first_shifting,
+            "straddle_strike": self._straddle_strike,
+            "lot_size": self._lot_size,
+            "remaining_lot_traded": self._remaining_lot_traded,
+            "stop_shifting_hedges": self._stop_shifting_hedges,
+            "straddle": self._pair_to_dict(self._straddle),
+            "hedging": self._pair_to_dict(self._hedging)
+        }
+        self._redis_backend.set(self.STATE_KEY, state)
+
+    def _restore_state(self) -> bool:
+        """ Rehydrate trade state saved by an earlier run of the same trading day.
+        Return True when a live entry was restored, in which case the control loop
+        resumes monitoring instead of re-entering """
+        state = self._redis_backend.get(self.STATE_KEY)
+        if not state or state.get("day") != istnow().date().isoformat():
+            return False
+        if not state.get("entry_taken"):
+            return False
+        self._entry_taken = True
+        self._entry_time = datetime.datetime.fromisoformat(state["entry_time"])
+        self._remaining_lot_sod = None
+        self._pnl = state["pnl"]
+        self._first_shifting = state["first_shifting"]
+        self._straddle_strike = state["straddle_strike"]
+        self._lot_size = state["lot_size"]
+        self._remaining_lot_traded = state["remaining_lot_traded"]
+        self._stop_shifting_hedges = state["stop_shifting_hedges"]
+        self._straddle = self._pair_from_dict(state["straddle"])
+        self._hedging = self._pair_from_dict(state["hedging"])
+        logger.info(f"Restored live trade state from redis: {state}")
+        return True
+
+    def shift_hedging(self, now: Optional[datetime.datetime] = None):
         """ Shift hedging close to Rs 5 """
-        now = istnow()
+        now = now or istnow()
+        # Hedge shifts that survive the checks below. Collected so that when both the
+        # legs need a shift they can run in parallel
+        shifts = []
         # Buy hedging
         ce_buy_strike = self._price_monitor.get_strike_by_price(
             price=self.ce_buy_price, option_type="CE"
@@ -538,7 +785,7 @@ class Strategy1(BaseStrategy):
             logger.info(f"Shifting CE hedge")
             logger.info(f"Current CE buy hedge: {self._hedging.ce_instrument.strike}")
             logger.info(f"New CE buy hedge: {ce_buy_strike}")
-            self.shift_ce_hedge(ce_buy_instrument)
+            shifts.append((self.shift_ce_hedge, ce_buy_instrument))
 
         if pe_buy_strike == self._hedging.pe_instrument.strike:
             logger.info(
@@ -564,7 +811,21 @@ class Strategy1(BaseStrategy):
             logger.info(f"Shifting PE hedge")
             logger.info(f"Current PE buy hedge: {self._hedging.pe_instrument.strike}")
             logger.info(f"New PE buy hedge: {pe_buy_strike}")
-            self.shift_pe_hedge(pe_buy_instrument)
+            shifts.append((self.shift_pe_hedge, pe_buy_instrument))
+
+        if len(shifts) == 1:
+            func, instrument = shifts[0]
+            func(instrument)
+        elif shifts:
+            # Both the legs need shifting. They are independent, so run them on the
+            # order executor to overlap the broker round trips
+            futures = [
+                self._order_executor.submit(func, instrument) for func, instrument in shifts
+            ]
+            wait(futures)
+            for future in futures:
+                # Re-raise any order placement error in the caller thread
+                future.result()
 
     def shift_ce_hedge(self, instrument: Instrument):
         """ Shift CE hedging leg """
@@ -573,11 +834,14 @@ class Strategy1(BaseStrategy):
         self.place_instrument_order(instrument)
         logger.info(f"Squaring off CE hedge: {self._hedging.ce_instrument}")
         pnl = self.get_instrument_pnl(self._hedging.ce_instrument)
-        logger.info(f"CE hedge PnL: {pnl}")
-        self._pnl += pnl
+        logger.info(f"CE hedge PnL: {pnl:.2f}")
         self._hedging.ce_instrument.action = Action.SELL
         self.place_instrument_order(self._hedging.ce_instrument)
-        self._hedging.ce_instrument = instrument
+        # May run concurrently with the PE shift, so mutate shared state under the lock
+        with self._lock:
+            self._pnl += pnl
+            self._hedging.ce_instrument = instrument
+            self._save_state()
 
     def shift_pe_hedge(self, instrument: Instrument):
         """ Shift PE hedging leg """
@@ -586,21 +850,25 @@ class Strategy1(BaseStrategy):
         self.place_instrument_order(instrument)
         logger.info(f"Squaring off PE hedge: {self._hedging.pe_instrument}")
         pnl = self.get_instrument_pnl(self._hedging.pe_instrument)
-        logger.info(f"PE hedge PnL: {pnl}")
-        self._pnl += pnl
+        logger.info(f"PE hedge PnL: {pnl:.2f}")
         self._hedging.pe_instrument.action = Action.SELL
         self.place_instrument_order(self._hedging.pe_instrument)
-        self._hedging.pe_instrument = instrument
+        # May run concurrently with the CE shift, so mutate shared state under the lock
+        with self._lock:
+            self._pnl += pnl
+            self._hedging.pe_instrument = instrument
+            self._save_state()
 
-    def trade_remaining_lot(self) -> None:
+    def trade_remaining_lot(self, now: Optional[datetime.datetime] = None) -> None:
         """
         Trade remaining lots if the initial straddle is same as current straddle else wait
         for next shifting
         """
-        now = istnow()
+        now = now or istnow()
         logger.info(f"Trading remaining {self.remaining_lot_size} lot at {now}")
         current_market_price = self._price_monitor.get_nifty_value()
-        current_straddle_strike = self._price_monitor.get_atm_strike()
+        # ATM strike derives from the nifty value we just fetched. Don't ask redis again
+        current_straddle_strike = self._price_monitor.get_nearest_50_strike(current_market_price)
         logger.info(f"Market price: {current_market_price}")
         logger.info(f"ATM strike: {current_straddle_strike}")
         if current_straddle_strike != self._straddle_strike:
@@ -610,69 +878,72 @@ class Strategy1(BaseStrategy):
             )
             return None
 
-        remaining_lot_hedging: PairInstrument = PairInstrument()
-        remaining_lot_hedging.ce_instrument = self.get_instrument(
-            strike=self._hedging.ce_instrument.strike,
-            option_type="CE",
-            action=Action.BUY,
-            lot_size=self.remaining_lot_size,
-            entry=now
-        )
-        remaining_lot_hedging.pe_instrument = self.get_instrument(
-            strike=self._hedging.pe_instrument.strike,
-            option_type="PE",
-            action=Action.BUY,
-            lot_size=self.remaining_lot_size,
-            entry=now
+        remaining_lot_hedging: PairInstrument = PairInstrument(
+            ce_instrument=self.get_instrument(
+                strike=self._hedging.ce_instrument.strike,
+                option_type="CE",
+                action=Action.BUY,
+                lot_size=self.remaining_lot_size,
+                entry=now
+            ),
+            pe_instrument=self.get_instrument(
+                strike=self._hedging.pe_instrument.strike,
+                option_type="PE",
+                action=Action.BUY,
+                lot_size=self.remaining_lot_size,
+                entry=now
+            )
         )
         logger.info(f"Hedging {remaining_lot_hedging}")
         hedging_price = self.get_pair_instrument_entry_price(remaining_lot_hedging)
-        logger.info(f"Hedging price: {hedging_price}")
-        self.place_pair_instrument_order(remaining_lot_hedging)
-
-        remaining_lot_straddle: PairInstrument = PairInstrument()
-        remaining_lot_straddle.ce_instrument = self.get_instrument(
-            strike=self._straddle_strike,
-            option_type="CE",
-            action=Action.SELL,
-            lot_size=self.remaining_lot_size,
-            entry=now
-        )
-        remaining_lot_straddle.pe_instrument = self.get_instrument(
-            strike=self._straddle_strike,
-            option_type="PE",
-            action=Action.SELL,
-            lot_size=self.remaining_lot_size,
-            entry=now
+        logger.info(f"Hedging price: {hedging_price:.2f}")
+        remaining_lot_straddle: PairInstrument = PairInstrument(
+            ce_instrument=self.get_instrument(
+                strike=self._straddle_strike,
+                option_type="CE",
+                action=Action.SELL,
+                lot_size=self.remaining_lot_size,
+                entry=now
+            ),
+            pe_instrument=self.get_instrument(
+                strike=self._straddle_strike,
+                option_type="PE",
+                action=Action.SELL,
+                lot_size=self.remaining_lot_size,
+                entry=now
+            )
         )
         logger.info(f"Shorting straddle {remaining_lot_straddle}")
         straddle_price = self.get_pair_instrument_entry_price(remaining_lot_straddle)
-        logger.info(f"Straddle price: {straddle_price}")
-        self.place_pair_instrument_order(remaining_lot_straddle)
-        # Update straddle price as Average Traded price
+        logger.info(f"Straddle price: {straddle_price:.2f}")
+        basket = [
+            remaining_lot_hedging.ce_instrument, remaining_lot_hedging.pe_instrument,
+            remaining_lot_straddle.ce_instrument, remaining_lot_straddle.pe_instrument
+        ]
+        if not self.place_basket_instrument_order(basket):
+            self.place_pair_instrument_order(remaining_lot_hedging)
+            self.place_pair_instrument_order(remaining_lot_straddle)
+        # Update straddle and hedge prices as Average Traded price
         # Price = (Initial Qty * Market Price + Remaining Qty * Market Price) /
         # (Initial Qty + Remaining Qty)
-        self._straddle.ce_instrument.price = \
-            (self._lot_size * self._straddle.ce_instrument.price + self.remaining_lot_size *
-             remaining_lot_straddle.ce_instrument.price) / (
-                    self._lot_size + self.remaining_lot_size)
-        self._straddle.pe_instrument.price = \
-            (self._lot_size * self._straddle.pe_instrument.price + self.remaining_lot_size *
-             remaining_lot_straddle.pe_instrument.price) / (
-                    self._lot_size + self.remaining_lot_size)
+        # Same algebra for all four legs, so hoist the weights and do one divide
+        initial_qty = self._lot_size
+        remaining_qty = self.remaining_lot_size
+        inv_total_qty = 1 / (initial_qty + remaining_qty)
+        for leg, remaining_leg in (
+            (self._straddle.ce_instrument, remaining_lot_straddle.ce_instrument),
+            (self._straddle.pe_instrument, remaining_lot_straddle.pe_instrument),
+            (self._hedging.ce_instrument, remaining_lot_hedging.ce_instrument),
+            (self._hedging.pe_instrument, remaining_lot_hedging.pe_instrument),
+        ):
+            leg.price = \
+                (initial_qty * leg.price + remaining_qty * remaining_leg.price) * inv_total_qty
         logger.info(
             f"ATP Straddle CE after trading remaining lot: {self._straddle.ce_instrument.price}"
         )
         logger.info(
             f"ATP Straddle PE after trading remaining lot: {self._straddle.pe_instrument.price}"
         )
-        # Update hedge price as Average Traded Price
-        self._hedging.ce_instrument.price = \
-            (self._lot_size * self._hedging.ce_instrument.price + self.remaining_lot_size *
-             remaining_lot_hedging.ce_instrument.price) / (self._lot_size + self.remaining_lot_size)
-        self._hedging.pe_instrument.price = \
-            (self._lot_size * self._hedging.pe_instrument.price + self.remaining_lot_size *
-             remaining_lot_hedging.pe_instrument.price) / (self._lot_size + self.remaining_lot_size)
         logger.info(
             f"ATP Hedge CE after trading remaining lot: {self._hedging.ce_instrument.price}"
         )
@@ -691,29 +962,31 @@ class Strategy1(BaseStrategy):
         self._hedging.ce_instrument.lot_size = self._lot_size * self.QUANTITY
         self._hedging.pe_instrument.lot_size = self._lot_size * self.QUANTITY
         self._remaining_lot_traded = True
+        self._save_state()
 
-    def buy_remaining_lot_hedging(self):
+    def buy_remaining_lot_hedging(self, now: Optional[datetime.datetime] = None):
         """ Buy remaining lot hedging while we add remaining lot during straddle shifting """
-        now = istnow()
+        now = now or istnow()
         logger.info(f"Buying remaining {self.remaining_lot_size} lot hedging at {now}")
-        remaining_lot_hedging: PairInstrument = PairInstrument()
-        remaining_lot_hedging.ce_instrument = self.get_instrument(
-            strike=self._hedging.ce_instrument.strike,
-            option_type="CE",
-            action=Action.BUY,
-            lot_size=self.remaining_lot_size,
-            entry=now
-        )
-        remaining_lot_hedging.pe_instrument = self.get_instrument(
-            strike=self._hedging.pe_instrument.strike,
-            option_type="PE",
-            action=Action.BUY,
-            lot_size=self.remaining_lot_size,
-            entry=now
+        remaining_lot_hedging: PairInstrument = PairInstrument(
+            ce_instrument=self.get_instrument(
+                strike=self._hedging.ce_instrument.strike,
+                option_type="CE",
+                action=Action.BUY,
+                lot_size=self.remaining_lot_size,
+                entry=now
+            ),
+            pe_instrument=self.get_instrument(
+                strike=self._hedging.pe_instrument.strike,
+                option_type="PE",
+                action=Action.BUY,
+                lot_size=self.remaining_lot_size,
+                entry=now
+            )
         )
         logger.info(f"Hedging {remaining_lot_hedging}")
         hedging_price = self.get_pair_instrument_entry_price(remaining_lot_hedging)
-        logger.info(f"Hedging price: {hedging_price}")
+        logger.info(f"Hedging price: {hedging_price:.2f}")
         self.place_pair_instrument_order(remaining_lot_hedging)
         # Update lot size for hedging
         self._hedging.ce_instrument.lot_size += self.remaining_lot_size * self.QUANTITY
@@ -743,31 +1016,55 @@ class Strategy1(BaseStrategy):
         return instrument
 
     def get_strategy_pnl(self):
-        """ Get the strategy pnl """
+        """ Get the strategy pnl. Calls within PNL_MEMO_TTL share one computation, so
+        repeated reads in the same tick don't re-fetch the orderbook (live mode) or
+        re-walk the open legs (dry run) """
+        now = time.monotonic()
+        memo = self._pnl_memo
+        if memo is not None and now - memo[0] < self.PNL_MEMO_TTL:
+            return memo[1]
         if self._dry_run:
-            return self.get_dry_run_pnl()
-        orderbook = self.get_orderbook()
-        return self.get_pnl_from_orderbook(orderbook)
+            pnl = self.get_dry_run_pnl()
+        else:
+            pnl = self.get_pnl_from_orderbook(self.get_orderbook())
+        self._pnl_memo = (now, pnl)
+        return pnl
 
     def get_dry_run_pnl(self):
         """ Return pnl when running in dry-run mode """
-        straddle_pnl = self.get_pair_instrument_pnl(self._straddle) if self._straddle else 0
-        hedging_pnl = self.get_pair_instrument_pnl(self._hedging) if self._hedging else 0
-        return round(self._pnl + straddle_pnl + hedging_pnl, 2)
+        legs = []
+        if self._straddle is not None:
+            legs += [self._straddle.ce_instrument, self._straddle.pe_instrument]
+        if self._hedging is not None:
+            legs += [self._hedging.ce_instrument, self._hedging.pe_instrument]
+        if not legs:
+            return round(self._pnl, 2)
+        # One MGET for every open leg instead of a round trip per pair
+        prices = self._price_monitor.get_prices_by_symbols([leg.symbol for leg in legs])
+        pnl = self._pnl
+        for leg, price in zip(legs, prices):
+            pnl += self.get_instrument_pnl(leg, current_price=price)
+        return round(pnl, 2)
 
     def get_pair_instrument_pnl(self, instrument: PairInstrument):
         """ Calculate current straddle pnl """
-        ce_pnl = self.get_instrument_pnl(instrument.ce_instrument)
-        pe_pnl = self.get_instrument_pnl(instrument.pe_instrument)
+        # Fetch both the leg prices in a single round trip
+        ce_price, pe_price = self._price_monitor.get_prices_by_symbols(
+            [instrument.ce_instrument.symbol, instrument.pe_instrument.symbol]
+        )
+        ce_pnl = self.get_instrument_pnl(instrument.ce_instrument, current_price=ce_price)
+        pe_pnl = self.get_instrument_pnl(instrument.pe_instrument, current_price=pe_price)
         return round(ce_pnl + pe_pnl, 2)
 
-    def get_instrument_pnl(self, instrument: Instrument):
+    def get_instrument_pnl(self, instrument: Instrument, current_price: float = None):
         """ Calculate pnl for an individual instrument """
         entry_price = instrument.price
-        current_price = self._price_monitor.get_price_by_symbol(instrument.symbol)
+        if current_price is None:
+            current_price = self._price_monitor.get_price_by_symbol(instrument.symbol)
         pnl = self.calc_pnl(entry_price, current_price, instrument.action)
-        # instrument lot size is lot size * quantity
-        return round(pnl * instrument.lot_size, 2)
+        # instrument lot size is lot size * quantity. Full precision here; callers
+        # round once at the aggregate they report
+        return pnl * instrument.lot_size
 
     @staticmethod
     def calc_pnl(entry_price: float, current_price: float, action: Action):
@@ -775,195 +1072,166 @@ class Strategy1(BaseStrategy):
         pnl = current_price - entry_price
         if action == Action.SELL:
             pnl *= -1
-        return round(pnl, 2)
+        return pnl
 
     @staticmethod
-    def orderbook_data_to_instrument(orderbook_data: dict) -> Instrument:
-        """ Convert a orderbook data to Instrument object """
-        expiry = datetime.datetime.strptime(orderbook_data["expirydate"], "%d%b%Y").date()
-        entry = datetime.datetime.strptime(orderbook_data["updatetime"], "%d-%b-%Y %H:%M:%S")
-        return Instrument(
-            action=orderbook_data["transactiontype"],
-            lot_size=int(orderbook_data["filledshares"]),
-            expiry=expiry,
-            option_type=orderbook_data["optiontype"],
-            strike=int(orderbook_data["strikeprice"]),
-            index="NIFTY",
-            entry=entry,
-            price=Strategy1.get_instrument_price_from_orderbook(orderbook_data),
-            order_id=orderbook_data["orderid"]
-        )
+    def _orderbook_symbol(order: dict) -> str:
+        """ Build the trading symbol for an orderbook entry """
+        return f"NIFTY{_expiry_symbol_fragment(order['expirydate'])}" \
+               f"{int(order['strikeprice'])}{order['optiontype']}"
 
     def get_pnl_from_orderbook(self, orderbook: list) -> float:
-        """ Calculate pnl using orderbook """
-        total_realised_pnl = 0
-        total_unrealised_pnl = 0
-        transactions = dict()
+        """ Calculate pnl using orderbook. Orders are matched FIFO against per symbol
+        open lots of (action, quantity, price) tuples, so a day's orderbook is swept
+        in one pass without building Instrument objects for every row """
+        realised_pnl = 0
+        open_lots = defaultdict(deque)
         for order in orderbook:
-            instrument = Strategy1.orderbook_data_to_instrument(order)
-            if instrument.symbol not in transactions:
-                transactions[instrument.symbol] = instrument
-            else:
-                transaction1 = transactions[instrument.symbol]
-                transaction2 = instrument
-                # if transaction type are different and quantities are equal, then we are
-                # squaring off the position
-                if transaction1.action != transaction2.action and \
-                        transaction1.lot_size == transaction2.lot_size:
-                    total_realised_pnl += Strategy1.calc_pnl_orderbook(transaction1, transaction2)
-                    # remove the trading symbol from the transactions
-                    transactions.pop(instrument.symbol)
+            quantity = int(order["filledshares"])
+            if not quantity:
+                # Rejected/unfilled orders carry no position
+                continue
+            price = order["averageprice"]
+            action = order["transactiontype"]
+            lots = open_lots[Strategy1._orderbook_symbol(order)]
+            # Square off open lots of the opposite side first
+            while quantity and lots and lots[0][0] != action:
+                lot_action, lot_quantity, lot_price = lots[0]
+                matched = min(quantity, lot_quantity)
+                if lot_action == "BUY":
+                    realised_pnl += (price - lot_price) * matched
                 else:
-                    pnl, transaction = Strategy1.update_transaction(
-                        transaction1=transaction1,
-                        transaction2=transaction2
-                    )
-                    transactions[instrument.symbol] = transaction
-                    total_realised_pnl += pnl
-        # Calculate unrealised pnl
-        for instrument in transactions.values():
-            current_price = self._price_monitor.get_price_by_symbol(instrument.symbol) * \
-                            instrument.lot_size
-            if instrument.action == "BUY":
-                # For BUY instrument we are saving the price in negative
-                total_unrealised_pnl += current_price + instrument.price
-            else:
-                total_unrealised_pnl += instrument.price - current_price
-        return round(total_realised_pnl + total_unrealised_pnl, 2)
-
-    @staticmethod
-    def get_instrument_price_from_orderbook(data: dict) -> float:
-        """ Return instrument price. For BUY return in negative and for SELL return in positive """
-        price = data["averageprice"] * int(data["filledshares"])
-        if data["transactiontype"] == "BUY":
-            price *= -1
-        return price
-
-    @staticmethod
-    def update_transaction(
-            transaction1: Instrument, transaction2: Instrument
-    ) -> Tuple[float, Instrument]:
-        """
-        Returns pnl if transactions are squaring off. Also returns the updated transaction.
-        """
-        if transaction1.action == transaction2.action:
-            price = transaction1.price + transaction2.price
-            quantity = transaction1.lot_size + transaction2.lot_size
-            # pnl is zero as we are not squaring off
-            pnl = 0
-            new_instrument_price = price
-            new_instrument_action = transaction1.action
-            new_instrument_quantity = quantity
-        else:
-            # Squaring off few quantities. If quantities are same for both transaction1
-            # and transaction2, then it should call calc_pnl_orderbook method
-            if transaction1.lot_size > transaction2.lot_size:
-                min_qty = transaction2.lot_size
-                price1 = round(transaction1.price / transaction1.lot_size * min_qty, 2)
-                price2 = transaction2.price
-                pnl = round(price1 + price2, 2)
-                new_instrument_price = transaction1.price - price1
-                new_instrument_action = transaction1.action
-                new_instrument_quantity = transaction1.lot_size - min_qty
-            else:
-                min_qty = transaction1.lot_size
-                price1 = transaction1.price
-                price2 = round(transaction2.price / transaction2.lot_size * min_qty, 2)
-                pnl = round(price1 + price2, 2)
-                new_instrument_price = transaction2.price - price2
-                new_instrument_action = transaction2.action
-                new_instrument_quantity = transaction2.lot_size - min_qty
-        new_instrument = Instrument(
-            action=new_instrument_action,
-            lot_size=new_instrument_quantity,
-            expiry=transaction2.expiry,
-            option_type=transaction2.option_type,
-            strike=transaction2.strike,
-            index=transaction2.index,
-            entry=transaction2.entry,
-            price=new_instrument_price,
-            order_id=transaction2.order_id
-        )
-        return pnl, new_instrument
+                    realised_pnl += (lot_price - price) * matched
+                if lot_quantity > matched:
+                    lots[0] = (lot_action, lot_quantity - matched, lot_price)
+                else:
+                    lots.popleft()
+                quantity -= matched
+            if quantity:
+                lots.append((action, quantity, price))
+        # Calculate unrealised pnl for the lots still open. One MGET fetches every
+        # open symbol instead of a round trip per symbol
+        unrealised_pnl = 0
+        open_symbols = [symbol for symbol, lots in open_lots.items() if lots]
+        if open_symbols:
+            prices = self._price_monitor.get_prices_by_symbols(open_symbols)
+            for symbol, current_price in zip(open_symbols, prices):
+                for action, quantity, price in open_lots[symbol]:
+                    if action == "BUY":
+                        unrealised_pnl += (current_price - price) * quantity
+                    else:
+                        unrealised_pnl += (price - current_price) * quantity
+        return round(realised_pnl + unrealised_pnl, 2)
 
-    @staticmethod
-    def calc_pnl_orderbook(transaction1: Instrument, transaction2: Instrument):
-        return transaction1.price + transaction2.price
+    def _next_wakeup_timeout(self, now: datetime.datetime) -> float:
+        """ How long the control loop may block on the event channel. Once a trade is
+        live the PnL/shifting checks must run every POLL_INTERVAL, but before entry
+        nothing happens until the entry time, so sleep towards that deadline instead
+        of waking every couple of seconds. Published events still interrupt the wait """
+        if self._entry_taken:
+            return self.POLL_INTERVAL
+        if self._entry_sod is None:
+            self._entry_sod = _to_sod(self.entry_time)
+        now_sec = _to_sod(now)
+        entry_sec = self._entry_sod
+        if now_sec >= entry_sec:
+            return self.POLL_INTERVAL
+        return max(self.POLL_INTERVAL, min(entry_sec - now_sec, self.MAX_IDLE_WAIT))
 
     def check_entry_time(self, dt: datetime.datetime) -> bool:
         """ Return True if the time is more than entry time. Entry time is 9:50 AM """
-        return dt.time() > self.entry_time
+        if self._entry_sod is None:
+            self._entry_sod = _to_sod(self.entry_time)
+        return _to_sod(dt) > self._entry_sod
 
     def check_exit_time(self, dt: datetime.datetime) -> bool:
         """ Return True if the time is more than exit time. Exit time is 3:00 PM """
-        return dt.time() > self.exit_time
+        if self._exit_sod is None:
+            self._exit_sod = _to_sod(self.exit_time)
+        return _to_sod(dt) > self._exit_sod
 
     def time_to_trade_remaining_lot(self, dt: datetime.datetime) -> bool:
         """ Return True if the time is more than entry time + 25 mins else False """
-        trade_time = self._entry_time + datetime.timedelta(minutes=25)
-        return dt.time() > trade_time.time()
+        if self._remaining_lot_sod is None:
+            self._remaining_lot_sod = _to_sod(self._entry_time) + 25 * 60
+        return _to_sod(dt) > self._remaining_lot_sod
 
     def get_pair_instrument_entry_price(self, pair_instrument: PairInstrument) -> float:
         """ Return pair instrument entry price which is summation of individual instrument """
-        price = pair_instrument.pe_instrument.price + pair_instrument.ce_instrument.price
-        return round(price, 2)
+        return pair_instrument.pe_instrument.price + pair_instrument.ce_instrument.price
 
     def get_pair_instrument_current_price(self, pair_instrument: PairInstrument) -> float:
         """ Return pair instrument current price by fetching the live feed from redis """
-        price = self._price_monitor.get_price_by_symbol(
-            pair_instrument.pe_instrument.symbol
-        )
-        price += self._price_monitor.get_price_by_symbol(
-            pair_instrument.ce_instrument.symbol
+        # Single MGET for both the legs
+        pe_price, ce_price = self._price_monitor.get_prices_by_symbols(
+            [pair_instrument.pe_instrument.symbol, pair_instrument.ce_instrument.symbol]
         )
-        return round(price, 2)
+        return pe_price + ce_price
 
     def get_current_straddle_price(self) -> float:
         """ Get the current straddle price """
         straddle_strike = self._price_monitor.get_atm_strike()
-        straddle: PairInstrument = PairInstrument()
-        straddle.ce_instrument = self.get_instrument(
-            strike=straddle_strike,
-            option_type="CE",
-            action=Action.SELL,
-            lot_size=self._lot_size,
-            entry=self._entry_time
-        )
-        straddle.pe_instrument = self.get_instrument(
-            strike=straddle_strike,
-            option_type="PE",
-            action=Action.SELL,
-            lot_size=self._lot_size,
-            entry=self._entry_time
+        straddle: PairInstrument = PairInstrument(
+            ce_instrument=self.get_instrument(
+                strike=straddle_strike,
+                option_type="CE",
+                action=Action.SELL,
+                lot_size=self._lot_size,
+                entry=self._entry_time
+            ),
+            pe_instrument=self.get_instrument(
+                strike=straddle_strike,
+                option_type="PE",
+                action=Action.SELL,
+                lot_size=self._lot_size,
+                entry=self._entry_time
+            )
         )
         straddle_price = self.get_pair_instrument_entry_price(straddle)
         return straddle_price
 
+    def _bind_day_config(self) -> None:
+        """ Pre-resolve the per-weekday config values once the trading day is known.
+        The properties below are read repeatedly per tick, so they become plain
+        attribute reads instead of .lower() plus nested dict traversals """
+        day = self._weekday_name
+        # The config is immutable for the lifetime of the strategy, so the float
+        # conversions happen here exactly once as well
+        self._sl_cfg = float(self._config["stop_loss"][day])
+        self._target_cfg = float(self._config["target"][day])
+        buy_cfg = self._config["option_buying"][day]
+        self._ce_buy_cfg = float(buy_cfg["CE"])
+        self._pe_buy_cfg = float(buy_cfg["PE"])
+        self._entry_time_cfg = self._config["entry_time"][day]
+        self._exit_time_cfg = self._config["exit_time"][day]
+        self._capital_percent_cfg = self._config["capital_to_trade_percent"][day]
+        self._margin_cfg = self._config["margin"][day]
+
     @property
     def sl_percent(self) -> float:
-        return float(self._config["stop_loss"][self._weekday.name.lower()])
+        return self._sl_cfg
 
     @property
     def target_percent(self) -> float:
-        return float(self._config["target"][self._weekday.name.lower()])
+        return self._target_cfg
 
     @property
     def ce_buy_price(self) -> float:
-        return float(self._config["option_buying"][self._weekday.name.lower()]["CE"])
+        return self._ce_buy_cfg
 
     @property
     def pe_buy_price(self) -> float:
-        return float(self._config["option_buying"][self._weekday.name.lower()]["PE"])
+        return self._pe_buy_cfg
 
     @property
     def entry_time(self) -> datetime.time:
         if self._changed_entry_time is None:
-            return self._day_config.time or self._config["entry_time"][self._weekday.name.lower()]
+            return self._day_config.time or self._entry_time_cfg
         return self._changed_entry_time
 
     @property
     def exit_time(self) -> datetime.time:
-        return self._config["exit_time"][self._weekday.name.lower()]
+        return self._exit_time_cfg
 
     @property
     def sl(self) -> float:
@@ -977,54 +1245,47 @@ class Strategy1(BaseStrategy):
             self._target = self.target_percent * self.initial_capital / 100
         return self._target
 
-    @property
+    @cached_property
     def initial_capital(self) -> float:
         """ Make API call to get initial capital in the account """
-        if self._initial_capital is None:
-            # API Call
-            if self._dry_run:
-                self._initial_capital = self._config["dry_run"]["initial_capital"]
-            else:
-                self._initial_capital = self.get_initial_capital()
-        return self._initial_capital
+        # API Call
+        if self._dry_run:
+            return self._config["dry_run"]["initial_capital"]
+        return self.get_initial_capital()
 
-    @property
+    @cached_property
     def capital_to_trade(self) -> float:
         """ Calculate capital to trade which is 95% of initial capital """
-        return self._config["capital_to_trade_percent"][self._weekday.name.lower()] * \
-               self.initial_capital
+        return self._capital_percent_cfg * self.initial_capital
 
     @property
     def expected_margin_per_lot(self) -> float:
         """ A rough estimate for margin per lot """
-        return self._config["margin"][self._weekday.name.lower()]
+        return self._margin_cfg
 
-    @property
+    @cached_property
     def actual_margin_per_lot(self) -> float:
         """ MAke API call to get actual margin used and divide it by initial lot """
-        if self._actual_margin_per_lot is None:
-            if self._dry_run:
-                self._actual_margin_per_lot = self._config["dry_run"]["actual_margin_per_lot"]
-            else:
-                margin_used = self.get_used_margin()    # Get this using API call
-                self._actual_margin_per_lot = round(margin_used / self.initial_lot_size, 2)
-            logger.info(f"Actual margin per lot: {self._actual_margin_per_lot}")
-        return self._actual_margin_per_lot
+        if self._dry_run:
+            margin_per_lot = self._config["dry_run"]["actual_margin_per_lot"]
+        else:
+            margin_used = self.get_used_margin()    # Get this using API call
+            margin_per_lot = round(margin_used / self.initial_lot_size, 2)
+        logger.info(f"Actual margin per lot: {margin_per_lot}")
+        return margin_per_lot
 
-    @property
+    @cached_property
     def initial_lot_size(self) -> int:
         """ Initial lot size based on your initial capital """
         return math.floor(math.floor(self.initial_capital / self.expected_margin_per_lot) / 2)
 
-    @property
+    @cached_property
     def remaining_lot_size(self) -> int:
         """ Calculate how many lot we can trade with the remaining capital """
-        if self._remaining_lot_size is None:
-            margin_used = self.actual_margin_per_lot * self.initial_lot_size
-            self._remaining_lot_size = math.floor(
-                (self.capital_to_trade - margin_used) / self.actual_margin_per_lot
-            )
-        return self._remaining_lot_size
+        margin_used = self.actual_margin_per_lot * self.initial_lot_size
+        return math.floor(
+            (self.capital_to_trade - margin_used) / self.actual_margin_per_lot
+        )
 
 
 if __name__ == "__main__":
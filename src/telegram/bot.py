@@ -3,6 +3,10 @@ File:           bot.py
 Author:         Dibyaranjan Sathua
 Created on:     01/04/23, 10:56 am
 """
+import queue
+import threading
+import time
+
 import requests
 
 from src.utils.config_reader import ConfigReader
@@ -18,8 +22,40 @@ class Bot:
         self._config: ConfigReader = config
         self._token: str = self._config["token"]
         self._chat_id: int = self._config["chat_id"]
+        # Notifications are delivered from a background thread so the telegram HTTPS
+        # round trip (easily a few hundred ms) never blocks the trading path
+        self._queue: queue.Queue = queue.Queue()
+        self._drain_thread = threading.Thread(target=self._drain, daemon=True)
+        self._drain_thread.start()
 
     def send_notification(self, message: str):
+        """ Queue a notification. Delivery happens on the background thread """
+        self._queue.put_nowait(message)
+
+    def send_notification_sync(self, message: str):
+        """ Send a notification on the caller's thread. Use for critical alerts that
+        must reach telegram before the process can exit """
+        self._send(message)
+
+    def flush(self, timeout: float = 10) -> None:
+        """ Wait until the queued notifications are delivered (or timeout expires).
+        Call before process exit so the drain thread isn't killed mid-queue """
+        deadline = time.monotonic() + timeout
+        while not self._queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+    def _drain(self):
+        """ Consume and deliver queued notifications """
+        while True:
+            message = self._queue.get()
+            try:
+                self._send(message)
+            except Exception as err:
+                logger.error(f"Error sending notification: {err}")
+            finally:
+                self._queue.task_done()
+
+    def _send(self, message: str):
         json_data = {
             "chat_id": self._chat_id,
             "text": message
@@ -63,3 +99,4 @@ if __name__ == "__main__":
     telegram_config = config["telegram"]
     bot = Bot(config=telegram_config)
     bot.send_notification("Testing notification from SathuaLabs")
+    bot.flush()
@@ -7,21 +7,24 @@ import datetime
 import pytz
 
 
+# Timezone objects are built once at import. pytz.timezone() does a registry lookup
+# (and possibly tz data parsing) per call, and these helpers sit on trading hot paths
+_IST = pytz.timezone("Asia/Kolkata")
+_UTC = pytz.utc
+
+
 def utc2ist(dt: datetime.datetime):
     """ Convert the given dt in utc to ist timezone """
-    utc_dt = pytz.utc.localize(dt)      # Add UTC timezone
-    ist_tz = pytz.timezone("Asia/Kolkata")
-    return utc_dt.astimezone(ist_tz)
+    return _UTC.localize(dt).astimezone(_IST)
 
 
 def istnow() -> datetime.datetime:
     """ Return current IST time """
-    utcnow = pytz.utc.localize(datetime.datetime.utcnow())
-    ist_tz = pytz.timezone("Asia/Kolkata")
-    return utcnow.astimezone(ist_tz)
+    # now(tz) is a single C call; the old utcnow/localize/astimezone chain built
+    # three intermediate datetimes
+    return datetime.datetime.now(_IST)
 
 
 def make_ist_aware(dt: datetime.datetime):
     """ Add IST timezone to the offset native datetime """
-    ist_tz = pytz.timezone("Asia/Kolkata")
-    return ist_tz.localize(dt)
+    return _IST.localize(dt)
@@ -44,20 +44,23 @@ class LogFacade:
             cls.__LOGGER_INSTANCES[name] = LogFacade(name=name, level=level)
         return cls.__LOGGER_INSTANCES[name]
 
-    def error(self, msg):
-        self._logger.error(msg)
+    def is_enabled_for(self, level) -> bool:
+        return self._logger.isEnabledFor(level)
 
-    def info(self, msg):
-        self._logger.info(msg)
+    def error(self, msg, *args):
+        self._logger.error(msg, *args)
 
-    def warning(self, msg):
-        self._logger.warning(msg)
+    def info(self, msg, *args):
+        self._logger.info(msg, *args)
 
-    def debug(self, msg):
-        self._logger.debug(msg)
+    def warning(self, msg, *args):
+        self._logger.warning(msg, *args)
 
-    def critical(self, msg):
-        self._logger.critical(msg)
+    def debug(self, msg, *args):
+        self._logger.debug(msg, *args)
 
-    def exception(self, msg):
-        self._logger.exception(msg)
+    def critical(self, msg, *args):
+        self._logger.critical(msg, *args)
+
+    def exception(self, msg, *args):
+        self._logger.exception(msg, *args)
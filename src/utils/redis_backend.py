@@ -12,10 +12,26 @@ from dotenv import load_dotenv
 
 from src import BASE_DIR
 
+try:
+    # C level JSON codec, noticeably faster on the per-tick symbol payloads
+    import orjson
+except ImportError:
+    orjson = None
+
 
 dotenv_path = BASE_DIR / 'env' / '.env'
 load_dotenv(dotenv_path=dotenv_path)
 
+scripts_dir = BASE_DIR / 'src' / 'utils' / 'redis_scripts'
+
+
+if orjson is not None:
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+else:
+    _json_dumps = json.dumps
+    _json_loads = json.loads
+
 
 class RedisBackend:
     """ Connect to redis backend and perform pub/sub """
@@ -28,18 +44,53 @@ class RedisBackend:
     def connect(self) -> None:
         self._redis = redis.Redis(host=self._host, port=self._port)
 
-    def set(self, key: str, data: Union[Dict, str]) -> None:
+    def set(self, key: str, data: Union[Dict, str], ex: Optional[int] = None) -> None:
         if isinstance(data, dict):
-            data = json.dumps(data)
-        self._redis.set(key, data)
+            data = _json_dumps(data)
+        self._redis.set(key, data, ex=ex)
+
+    def delete(self, *keys: str) -> None:
+        """ Delete the given keys """
+        self._redis.delete(*keys)
 
     def get(self, key: str) -> Optional[Dict]:
         data = self._redis.get(key)
         if data:
-            try:
-                return json.loads(data)
-            except json.decoder.JSONDecodeError:
-                return data.decode("utf-8")
+            return self.decode(data)
+
+    def mget(self, keys: list) -> list:
+        """ Get several keys in one round trip. Missing keys come back as None """
+        return [self.decode(data) if data else None for data in self._redis.mget(keys)]
+
+    @staticmethod
+    def decode(data: bytes) -> Union[Dict, str]:
+        """ Decode a raw redis value the same way get() does. Useful for values coming
+        back from a pipeline """
+        try:
+            return _json_loads(data)
+        except ValueError:
+            return data.decode("utf-8")
+
+    def pipeline(self):
+        """ Return a pipeline so callers can batch multiple commands into one round trip """
+        return self._redis.pipeline(transaction=False)
+
+    def register_script(self, name: str):
+        """ Register a server side lua script from the redis_scripts directory. Returns
+        the callable redis-py wraps around EVALSHA """
+        script = (scripts_dir / name).read_text()
+        return self._redis.register_script(script)
+
+    def publish(self, channel: str, message: str) -> None:
+        """ Publish a message on a pub/sub channel """
+        self._redis.publish(channel, message)
+
+    def pubsub(self, *channels: str):
+        """ Return a pub/sub object subscribed to the given channels. Callers use
+        get_message(timeout=...) to block until an event arrives instead of polling """
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(*channels)
+        return pubsub
 
     def cleanup(self, pattern="NIFTY*") -> None:
         """ Delete all keys matching the pattern so that everyday we have fresh data """
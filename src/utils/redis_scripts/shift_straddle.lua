@@ -0,0 +1,9 @@
+-- Record the live straddle after an entry or a shift in one atomic call.
+-- KEYS[1]: hash mirroring the straddle state
+-- ARGV[1]: strike, ARGV[2]: ce symbol, ARGV[3]: pe symbol, ARGV[4]: entry timestamp
+local seq = redis.call('HINCRBY', KEYS[1], 'seq', 1)
+redis.call(
+    'HSET', KEYS[1],
+    'strike', ARGV[1], 'ce', ARGV[2], 'pe', ARGV[3], 'entry', ARGV[4]
+)
+return seq